@@ -2,14 +2,17 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import REPLICA_DATABASE_URLS, get_async_db, read_session_factory
 from ..models import User
 from ..schemas import Token, UserCreate, User as UserSchema
+from ..utils.cache import has_recent_write
 
 # Configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use a secure secret key
@@ -27,14 +30,16 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username).limit(1))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is slow by design: hash outside the event loop
+    if not await run_in_threadpool(verify_password, password, user.hashed_password):
         return False
     return user
 
@@ -48,7 +53,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -61,14 +66,37 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user(db, username=username)
+    user = await get_user(db, username=username)
     if user is None:
         raise credentials_exception
     return user
 
+async def get_read_db(current_user: User = Depends(get_current_user)):
+    """
+    Dependency to get a DB session for read-only endpoints.
+    
+    Sessions go to the read replicas in turn. A user who wrote recently
+    (uploaded a report, or had one processed) reads from the primary
+    instead, so that they see their own writes whatever the replicas' lag.
+    The user is looked up on the primary, like all authentication.
+    
+    A session on a replica is marked so in its info; an endpoint that moves
+    to the primary mid-request (see ensure_rehydrated) leaves the primary
+    session there, and it is closed with the request.
+    """
+    primary = not REPLICA_DATABASE_URLS or await has_recent_write(current_user.id)
+    async with read_session_factory(primary)() as db:
+        db.info["replica"] = not primary
+        try:
+            yield db
+        finally:
+            primary_session = db.info.pop("primary_session", None)
+            if primary_session is not None:
+                await primary_session.close()
+
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -82,22 +110,22 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=UserSchema)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user(db, username=user.username)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.get("/me", response_model=UserSchema)
@@ -1,12 +1,16 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import requests
 import json
 
-from ..database import get_db
 from ..models import User, Report, PnLData
 from ..schemas import ChatRequest, ChatResponse
+from ..utils.archive import ensure_rehydrated
+from ..utils.series import pnl_row_order
+from .auth import get_current_user, get_read_db
 
 router = APIRouter()
 
@@ -18,7 +22,7 @@ GLM_API_KEY = "your-glm-api-key"  # In production, use environment variables
 async def chat(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         # Prepare system message
@@ -42,28 +46,34 @@ async def chat(
         }
         
         # Get the latest report for context
-        latest_report = db.query(Report).filter(
+        result = await db.execute(select(Report).where(
             Report.owner_id == current_user.id,
             Report.is_processed == True
-        ).order_by(Report.upload_date.desc()).first()
+        ).order_by(Report.upload_date.desc()).limit(1))
+        latest_report = result.scalars().first()
         
         context_message = None
         if latest_report:
+            db = await ensure_rehydrated(db, latest_report)
+            
             # Get key financial metrics from the latest report
-            revenue = db.query(PnLData).filter(
+            result = await db.execute(select(PnLData).where(
                 PnLData.report_id == latest_report.id,
                 PnLData.account_name == "Group Revenue"
-            ).first()
+            ).order_by(*pnl_row_order(PnLData)).limit(1))
+            revenue = result.scalars().first()
             
-            gross_profit = db.query(PnLData).filter(
+            result = await db.execute(select(PnLData).where(
                 PnLData.report_id == latest_report.id,
                 PnLData.account_name == "Gross Profit"
-            ).first()
+            ).order_by(*pnl_row_order(PnLData)).limit(1))
+            gross_profit = result.scalars().first()
             
-            net_profit = db.query(PnLData).filter(
+            result = await db.execute(select(PnLData).where(
                 PnLData.report_id == latest_report.id,
                 PnLData.account_name == "Net Profit before Tax"
-            ).first()
+            ).order_by(*pnl_row_order(PnLData)).limit(1))
+            net_profit = result.scalars().first()
             
             context_info = f"Latest report from {latest_report.month}. "
             
@@ -102,7 +112,8 @@ async def chat(
             "temperature": 0.7
         }
         
-        response = requests.post(GLM_API_URL, headers=headers, json=data)
+        # requests is blocking: call the API from a worker thread
+        response = await run_in_threadpool(requests.post, GLM_API_URL, headers=headers, json=data)
         
         if response.status_code != 200:
             raise HTTPException(status_code=500, detail="Error calling GLM API")
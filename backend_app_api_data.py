@@ -1,252 +1,118 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
 import os
+import re
 import json
-from datetime import datetime
+import uuid
+import asyncio
+from celery.result import AsyncResult
+from fastapi.concurrency import run_in_threadpool
+import zipfile
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User, Report, PnLData, RedFlag, EntityAnalysis
 from ..schemas import (
-    DashboardResponse, KPIData, MonthlyData, EntityData, RedFlagData,
+    DashboardResponse,
     AnalysisResponse, CostAnalysisData, RevenueAnalysisData, 
     ProfitabilityAnalysisData, RecommendationData,
     BenchmarkingResponse, IndustryBenchmarkData, CompetitorData, 
-    HistoricalBenchmarkData, FilesResponse, FileData
+    HistoricalBenchmarkData, FilesResponse, FileData, JobStatusResponse,
+    BatchFileData, BatchStatusResponse
 )
-from ..utils.data_processor import process_excel_file
-from ..utils.file_handler import save_upload_file
+from ..tasks import process_report, process_report_batch
+from ..utils.file_handler import save_upload_file, extract_archive, delete_file, UploadTooLargeError, MAX_BATCH_SIZE
+from ..utils.telemetry import IngestionStats
+from ..utils.cache import cached_response, amark_user_write
+from ..utils.dashboard import build_dashboard
+from ..utils.kpi_rollup import load_kpi_series
+from ..utils.series import shift_month
+from ..utils.pnl_series import load_report_series
+from ..utils.archive import ensure_rehydrated, ARCHIVED_STATUS
+from .auth import get_current_user, get_read_db
 
 router = APIRouter()
 
+# Files of a batch zip that are ingested as reports: workbooks, and zips
+# holding the CSV/Parquet export of one month
+BATCH_FILE_EXTENSIONS = ('.xlsx', '.zip')
+
+MONTH_FORMAT = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+# "2025-03", "2025_03", "202503" or "2025.03" in a file name
+FILENAME_MONTH = re.compile(r"(?<!\d)(20\d{2})[-_. ]?(0[1-9]|1[0-2])(?!\d)")
+
 @router.get("/dashboard", response_model=DashboardResponse)
+@cached_response("dashboard", ("month",))
 async def get_dashboard_data(
     month: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Get the report for the specified month
-    report = db.query(Report).filter(
+    # An archived month's entities and red flags are read from its rows
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
-        Report.is_processed == True
-    ).first()
-    
-    if not report:
+        Report.is_processed == True,
+        Report.status == ARCHIVED_STATUS
+    ).limit(1))
+    archived = result.scalars().first()
+    if archived:
+        db = await ensure_rehydrated(db, archived)
+    
+    dashboard = await db.run_sync(build_dashboard, current_user.id, month)
+    if dashboard is None:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # Get KPI data
-    revenue = db.query(PnLData).filter(
-        PnLData.report_id == report.id,
-        PnLData.account_name == "Group Revenue"
-    ).first()
-    
-    gross_profit = db.query(PnLData).filter(
-        PnLData.report_id == report.id,
-        PnLData.account_name == "Gross Profit"
-    ).first()
-    
-    opex = db.query(PnLData).filter(
-        PnLData.report_id == report.id,
-        PnLData.category == "Opex"
-    ).first()
-    
-    net_profit = db.query(PnLData).filter(
-        PnLData.report_id == report.id,
-        PnLData.account_name == "Net Profit before Tax"
-    ).first()
-    
-    # Get previous month data for comparison
-    prev_month = datetime.strptime(month, "%Y-%m").replace(month=datetime.strptime(month, "%Y-%m").month - 1).strftime("%Y-%m")
-    prev_report = db.query(Report).filter(
-        Report.month == prev_month,
-        Report.owner_id == current_user.id,
-        Report.is_processed == True
-    ).first()
-    
-    prev_revenue = None
-    prev_gpm = None
-    prev_opex = None
-    prev_net_profit = None
-    
-    if prev_report:
-        prev_revenue_data = db.query(PnLData).filter(
-            PnLData.report_id == prev_report.id,
-            PnLData.account_name == "Group Revenue"
-        ).first()
-        
-        prev_gross_profit_data = db.query(PnLData).filter(
-            PnLData.report_id == prev_report.id,
-            PnLData.account_name == "Gross Profit"
-        ).first()
-        
-        prev_opex_data = db.query(PnLData).filter(
-            PnLData.report_id == prev_report.id,
-            PnLData.category == "Opex"
-        ).first()
-        
-        prev_net_profit_data = db.query(PnLData).filter(
-            PnLData.report_id == prev_report.id,
-            PnLData.account_name == "Net Profit before Tax"
-        ).first()
-        
-        if prev_revenue_data:
-            prev_revenue = prev_revenue_data.actuals
-        if prev_gross_profit_data and revenue:
-            prev_gpm = (prev_gross_profit_data.actuals / prev_revenue_data.actuals) * 100
-        if prev_opex_data:
-            prev_opex = prev_opex_data.actuals
-        if prev_net_profit_data:
-            prev_net_profit = prev_net_profit_data.actuals
-    
-    # Calculate KPIs
-    revenue_amount = revenue.actuals if revenue else 0
-    revenue_change = ((revenue_amount - prev_revenue) / prev_revenue * 100) if prev_revenue else 0
-    
-    gpm = (gross_profit.actuals / revenue.actuals * 100) if revenue and gross_profit else 0
-    gpm_change = gpm - prev_gpm if prev_gpm is not None else 0
-    
-    opex_amount = sum([op.actuals for op in db.query(PnLData).filter(
-        PnLData.report_id == report.id,
-        PnLData.category == "Opex"
-    ).all()])
-    opex_change = ((opex_amount - prev_opex) / prev_opex * 100) if prev_opex else 0
-    
-    net_profit_amount = net_profit.actuals if net_profit else 0
-    net_profit_change = ((net_profit_amount - prev_net_profit) / prev_net_profit * 100) if prev_net_profit else 0
-    
-    kpi_data = KPIData(
-        revenue=revenue_amount,
-        revenueChange=revenue_change,
-        gpm=gpm,
-        gpmChange=gpm_change,
-        opex=opex_amount,
-        opexChange=opex_change,
-        netProfit=net_profit_amount,
-        netProfitChange=net_profit_change
-    )
-    
-    # Get monthly data for the past 12 months
-    monthly_data = []
-    for i in range(12):
-        month_date = datetime.strptime(month, "%Y-%m").replace(month=datetime.strptime(month, "%Y-%m").month - i)
-        month_str = month_date.strftime("%Y-%m")
-        
-        month_report = db.query(Report).filter(
-            Report.month == month_str,
-            Report.owner_id == current_user.id,
-            Report.is_processed == True
-        ).first()
-        
-        if month_report:
-            month_revenue = db.query(PnLData).filter(
-                PnLData.report_id == month_report.id,
-                PnLData.account_name == "Group Revenue"
-            ).first()
-            
-            month_gross_profit = db.query(PnLData).filter(
-                PnLData.report_id == month_report.id,
-                PnLData.account_name == "Gross Profit"
-            ).first()
-            
-            month_net_profit = db.query(PnLData).filter(
-                PnLData.report_id == month_report.id,
-                PnLData.account_name == "Net Profit before Tax"
-            ).first()
-            
-            revenue_amount = month_revenue.actuals if month_revenue else 0
-            gross_profit_amount = month_gross_profit.actuals if month_gross_profit else 0
-            net_profit_amount = month_net_profit.actuals if month_net_profit else 0
-            
-            gpm = (gross_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-            opm = (net_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-            npm = opm  # Simplified, should be calculated after tax
-            
-            monthly_data.append(MonthlyData(
-                month=month_str,
-                revenue=revenue_amount,
-                grossProfit=gross_profit_amount,
-                netProfit=net_profit_amount,
-                gpm=gpm,
-                opm=opm,
-                npm=npm
-            ))
-    
-    # Get entity data
-    entities = db.query(EntityAnalysis).filter(
-        EntityAnalysis.report_id == report.id
-    ).all()
-    
-    entity_data = [
-        EntityData(
-            entity=entity.entity_name,
-            revenue=entity.total_revenue,
-            cost=entity.total_cost,
-            gp=entity.gross_profit,
-            gpm=entity.gpm
-        )
-        for entity in entities
-    ]
-    
-    # Get red flags
-    red_flags = db.query(RedFlag).filter(
-        RedFlag.report_id == report.id
-    ).all()
-    
-    red_flag_data = [
-        RedFlagData(
-            project=flag.project_name,
-            country=flag.country,
-            gpm=flag.gpm,
-            comment=flag.comment
-        )
-        for flag in red_flags
-    ]
-    
-    return DashboardResponse(
-        success=True,
-        kpi=kpi_data,
-        monthly=monthly_data,
-        entities=entity_data,
-        redFlags=red_flag_data
-    )
+    return dashboard
 
 @router.get("/pnl")
+@cached_response("pnl", ("month", "target"))
 async def get_pnl_data(
     month: str,
     target: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # Get P&L data
-    pnl_data = db.query(PnLData).filter(
-        PnLData.report_id == report.id
-    ).all()
-    
-    # Convert to DataFrame for easier manipulation
-    data = []
-    for item in pnl_data:
-        data.append({
-            "account_name": item.account_name,
-            "category": item.category,
-            "actuals": item.actuals,
-            "forecast": item.forecast,
-            "variance": item.variance,
-            "variance_pct": item.variance_pct
-        })
-    
-    df = pd.DataFrame(data)
+    db = await ensure_rehydrated(db, report)
+    
+    # Get P&L data: the packed series of the report, decoded in one go, or
+    # the rows of a report ingested before series were written
+    series = await db.run_sync(load_report_series, report.id)
+    if series is not None:
+        df = series.to_frame()[["account_name", "category", "actuals", "forecast"]]
+        df = df.assign(variance=None, variance_pct=None)
+    else:
+        result = await db.execute(select(PnLData).where(
+            PnLData.report_id == report.id
+        ))
+        pnl_data = result.scalars().all()
+        
+        # Convert to DataFrame for easier manipulation
+        data = []
+        for item in pnl_data:
+            data.append({
+                "account_name": item.account_name,
+                "category": item.category,
+                "actuals": item.actuals,
+                "forecast": item.forecast,
+                "variance": item.variance,
+                "variance_pct": item.variance_pct
+            })
+        
+        df = pd.DataFrame(data)
     
     # If target is specified, filter for that target
     if target:
@@ -262,28 +128,33 @@ async def get_pnl_data(
     return df.to_dict(orient="records")
 
 @router.get("/analysis")
+@cached_response("analysis", ("month", "type"))
 async def get_analysis_data(
     month: str,
     type: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
+    db = await ensure_rehydrated(db, report)
+    
     if type == "cost":
         # Get cost breakdown
-        cost_data = db.query(PnLData).filter(
+        result = await db.execute(select(PnLData).where(
             PnLData.report_id == report.id,
             PnLData.category == "Opex"
-        ).all()
+        ))
+        cost_data = result.scalars().all()
         
         total_cost = sum([item.actuals for item in cost_data])
         
@@ -319,10 +190,11 @@ async def get_analysis_data(
     
     elif type == "revenue":
         # Get revenue breakdown
-        revenue_data = db.query(PnLData).filter(
+        result = await db.execute(select(PnLData).where(
             PnLData.report_id == report.id,
             PnLData.category == "Revenue"
-        ).all()
+        ))
+        revenue_data = result.scalars().all()
         
         total_revenue = sum([item.actuals for item in revenue_data])
         
@@ -357,66 +229,34 @@ async def get_analysis_data(
         )
     
     elif type == "profitability":
-        # Get profitability data for the past 12 months
+        # Get profitability data for the past 12 months, newest first
+        series = await db.run_sync(
+            load_kpi_series, current_user.id, month, 12,
+            ("revenue", "direct_costs", "gross_profit", "opex", "net_profit", "gpm", "opm", "npm")
+        )
         profitability_data = []
         
-        for i in range(12):
-            month_date = datetime.strptime(month, "%Y-%m").replace(month=datetime.strptime(month, "%Y-%m").month - i)
-            month_str = month_date.strftime("%Y-%m")
+        for month_str in reversed(series.months):
+            if series.report_id(month_str) is None:
+                continue
             
-            month_report = db.query(Report).filter(
-                Report.month == month_str,
-                Report.owner_id == current_user.id,
-                Report.is_processed == True
-            ).first()
+            revenue_amount = series.get(month_str, "revenue", 0)
+            cost_amount = series.get(month_str, "direct_costs", 0)
+            gross_profit_amount = series.get(month_str, "gross_profit", 0)
+            opex_amount = series.get(month_str, "opex", 0)
+            net_profit_amount = series.get(month_str, "net_profit", 0)
             
-            if month_report:
-                month_revenue = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Group Revenue"
-                ).first()
-                
-                month_cost = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.category == "Direct Costs"
-                ).first()
-                
-                month_gross_profit = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Gross Profit"
-                ).first()
-                
-                month_opex = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.category == "Opex"
-                ).all()
-                
-                month_net_profit = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Net Profit before Tax"
-                ).first()
-                
-                revenue_amount = month_revenue.actuals if month_revenue else 0
-                cost_amount = month_cost.actuals if month_cost else 0
-                gross_profit_amount = month_gross_profit.actuals if month_gross_profit else 0
-                opex_amount = sum([item.actuals for item in month_opex])
-                net_profit_amount = month_net_profit.actuals if month_net_profit else 0
-                
-                gpm = (gross_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-                opm = (net_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-                npm = opm  # Simplified, should be calculated after tax
-                
-                profitability_data.append(ProfitabilityAnalysisData(
-                    month=month_str,
-                    revenue=revenue_amount,
-                    cost=cost_amount,
-                    grossProfit=gross_profit_amount,
-                    gpm=gpm,
-                    operatingProfit=net_profit_amount + opex_amount,
-                    opm=opm,
-                    netProfit=net_profit_amount,
-                    npm=npm
-                ))
+            profitability_data.append(ProfitabilityAnalysisData(
+                month=month_str,
+                revenue=revenue_amount,
+                cost=cost_amount,
+                grossProfit=gross_profit_amount,
+                gpm=series.get(month_str, "gpm", 0),
+                operatingProfit=net_profit_amount + opex_amount,
+                opm=series.get(month_str, "opm", 0),
+                netProfit=net_profit_amount,
+                npm=series.get(month_str, "npm", 0)
+            ))
         
         # Generate recommendations based on profitability analysis
         recommendations = [
@@ -442,18 +282,29 @@ async def get_analysis_data(
         raise HTTPException(status_code=400, detail="Invalid analysis type")
 
 @router.get("/benchmarking")
+@cached_response("benchmarking", ("month", "type"))
 async def get_benchmarking_data(
     month: str,
     type: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """
+    Industry, competitor or historical benchmarks of a month.
+    
+    Unlike the endpoints that read a report's rows (dashboard, P&L,
+    analysis, chat, predictions), this one never rehydrates an archived
+    report: the historical benchmark reads every month, archived ones
+    included, from the KPI rollup, on the read session. The rollup keeps
+    the archived months' KPIs, so their figures are the same either way.
+    """
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -543,82 +394,37 @@ async def get_benchmarking_data(
         )
     
     elif type == "historical":
-        # Get historical benchmark data for the past 12 months
+        # Get historical benchmark data for the past 12 months, newest
+        # first, with the 12 before them for year-over-year growth
+        series = await db.run_sync(load_kpi_series, current_user.id, month, 24, ("revenue", "net_profit", "gpm", "opm", "npm"))
         historical_data = []
         
-        for i in range(12):
-            month_date = datetime.strptime(month, "%Y-%m").replace(month=datetime.strptime(month, "%Y-%m").month - i)
-            month_str = month_date.strftime("%Y-%m")
+        for month_str in reversed(series.months[12:]):
+            if series.report_id(month_str) is None:
+                continue
             
-            month_report = db.query(Report).filter(
-                Report.month == month_str,
-                Report.owner_id == current_user.id,
-                Report.is_processed == True
-            ).first()
+            revenue_amount = series.get(month_str, "revenue", 0)
+            net_profit_amount = series.get(month_str, "net_profit", 0)
             
-            if month_report:
-                month_revenue = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Group Revenue"
-                ).first()
-                
-                month_gross_profit = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Gross Profit"
-                ).first()
-                
-                month_net_profit = db.query(PnLData).filter(
-                    PnLData.report_id == month_report.id,
-                    PnLData.account_name == "Net Profit before Tax"
-                ).first()
-                
-                revenue_amount = month_revenue.actuals if month_revenue else 0
-                gross_profit_amount = month_gross_profit.actuals if month_gross_profit else 0
-                net_profit_amount = month_net_profit.actuals if month_net_profit else 0
-                
-                gpm = (gross_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-                opm = (net_profit_amount / revenue_amount * 100) if revenue_amount > 0 else 0
-                npm = opm  # Simplified, should be calculated after tax
-                
-                # Calculate YoY growth
-                prev_year_month = datetime.strptime(month_str, "%Y-%m").replace(year=datetime.strptime(month_str, "%Y-%m").year - 1).strftime("%Y-%m")
-                prev_year_report = db.query(Report).filter(
-                    Report.month == prev_year_month,
-                    Report.owner_id == current_user.id,
-                    Report.is_processed == True
-                ).first()
-                
-                prev_year_revenue = 0
-                prev_year_net_profit = 0
-                
-                if prev_year_report:
-                    prev_year_revenue_data = db.query(PnLData).filter(
-                        PnLData.report_id == prev_year_report.id,
-                        PnLData.account_name == "Group Revenue"
-                    ).first()
-                    
-                    prev_year_net_profit_data = db.query(PnLData).filter(
-                        PnLData.report_id == prev_year_report.id,
-                        PnLData.account_name == "Net Profit before Tax"
-                    ).first()
-                    
-                    prev_year_revenue = prev_year_revenue_data.actuals if prev_year_revenue_data else 0
-                    prev_year_net_profit = prev_year_net_profit_data.actuals if prev_year_net_profit_data else 0
-                
-                yoy_revenue_growth = ((revenue_amount - prev_year_revenue) / prev_year_revenue * 100) if prev_year_revenue > 0 else 0
-                yoy_profit_growth = ((net_profit_amount - prev_year_net_profit) / prev_year_net_profit * 100) if prev_year_net_profit > 0 else 0
-                
-                historical_data.append(HistoricalBenchmarkData(
-                    month=month_str,
-                    revenue=revenue_amount,
-                    revenueGrowth=0,  # Would need previous month data
-                    profitGrowth=0,  # Would need previous month data
-                    gpm=gpm,
-                    opm=opm,
-                    npm=npm,
-                    yoyRevenueGrowth=yoy_revenue_growth,
-                    yoyProfitGrowth=yoy_profit_growth
-                ))
+            # Calculate YoY growth
+            prev_year_month = shift_month(month_str, -12)
+            prev_year_revenue = series.get(prev_year_month, "revenue", 0)
+            prev_year_net_profit = series.get(prev_year_month, "net_profit", 0)
+            
+            yoy_revenue_growth = ((revenue_amount - prev_year_revenue) / prev_year_revenue * 100) if prev_year_revenue > 0 else 0
+            yoy_profit_growth = ((net_profit_amount - prev_year_net_profit) / prev_year_net_profit * 100) if prev_year_net_profit > 0 else 0
+            
+            historical_data.append(HistoricalBenchmarkData(
+                month=month_str,
+                revenue=revenue_amount,
+                revenueGrowth=series.get_mom(month_str, "revenue", 0),
+                profitGrowth=series.get_mom(month_str, "net_profit", 0),
+                gpm=series.get(month_str, "gpm", 0),
+                opm=series.get(month_str, "opm", 0),
+                npm=series.get(month_str, "npm", 0),
+                yoyRevenueGrowth=yoy_revenue_growth,
+                yoyProfitGrowth=yoy_profit_growth
+            ))
         
         return BenchmarkingResponse(
             success=True,
@@ -633,13 +439,14 @@ async def get_benchmarking_data(
 @router.get("/latest")
 async def get_latest_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get the latest report for the current user
-    latest_report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).order_by(Report.upload_date.desc()).first()
+    ).order_by(Report.upload_date.desc()).limit(1))
+    latest_report = result.scalars().first()
     
     if not latest_report:
         return {"success": False, "message": "No reports found"}
@@ -656,58 +463,363 @@ async def upload_file(
     month: str = Form(...),
     year: int = Form(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Save the uploaded file
-    file_path = await save_upload_file(file, current_user.id)
+    stats = IngestionStats()
+    try:
+        file_path, content_hash = await save_upload_file(file, current_user.id, stats=stats)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    # The same workbook was already uploaded for this month: link to that
+    # report instead of parsing it again
+    existing = await find_duplicate_report(db, current_user.id, month, content_hash)
+    
+    if existing:
+        delete_file(file_path)
+        return {
+            "success": True,
+            "message": "Identical file already uploaded",
+            "jobId": existing.job_id,
+            "reportId": existing.id,
+            "status": existing.status,
+            "duplicate": True
+        }
     
     # Create a report record
     report = Report(
         filename=file.filename,
         file_path=file_path,
+        content_hash=content_hash,
         month=month,
         year=year,
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        status="Queued",
+        job_id=str(uuid.uuid4()),
+        ingest_metrics=stats.to_json()
     )
     db.add(report)
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    await db.refresh(report)
+    await amark_user_write(current_user.id)
     
     try:
-        # Process the Excel file
-        process_excel_file(file_path, report.id, db)
-        
-        # Mark the report as processed
-        report.is_processed = True
-        db.commit()
-        
-        return {"success": True, "message": "File uploaded and processed successfully"}
+        # Process the Excel file in the background (in eager mode, right
+        # here: off the event loop either way)
+        await run_in_threadpool(process_report.apply_async, args=[report.id], task_id=report.job_id)
     except Exception as e:
-        # If processing fails, delete the report and file
-        db.delete(report)
-        db.commit()
+        # The job could not be queued, so nothing will ever process the report
+        await db.delete(report)
+        await db.commit()
         
         if os.path.exists(file_path):
             os.remove(file_path)
         
-        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Error queuing file for processing: {str(e)}")
+    
+    # In eager mode the job has already run, and a re-upload may have been
+    # folded into the existing report for the month
+    job_id = report.job_id
+    report_id = report.id
+    db.expire_all()
+    result = await db.execute(select(Report).where(Report.job_id == job_id).limit(1))
+    job_report = result.scalars().first()
+    
+    return {
+        "success": True,
+        "message": "File uploaded, processing started",
+        "jobId": job_id,
+        "reportId": job_report.id if job_report else report_id,
+        "status": job_report.status if job_report else "Queued",
+        "duplicate": False
+    }
+
+async def find_duplicate_report(db: AsyncSession, owner_id: int, month: str, content_hash: str) -> Optional[Report]:
+    """Return the live report of a month that was uploaded with the same content, if any."""
+    result = await db.execute(select(Report).where(
+        Report.owner_id == owner_id,
+        Report.month == month,
+        Report.content_hash == content_hash,
+        Report.status.in_(["Queued", "Processing", "Processed", ARCHIVED_STATUS])
+    ).order_by(Report.upload_date.desc()).limit(1))
+    return result.scalars().first()
+
+def infer_report_month(filename: str) -> Optional[str]:
+    """Read the report month ("YYYY-MM") from a file name such as "PnL_2025-03.xlsx"."""
+    match = FILENAME_MONTH.search(os.path.basename(filename))
+    return f"{match.group(1)}-{match.group(2)}" if match else None
+
+async def save_batch_files(files: List[UploadFile], user_id: int) -> List[tuple]:
+    """
+    Save the files of a batch upload, unpacking zips of workbooks into their files.
+    
+    Zips are checked against the size limits before they are unpacked, and
+    all the files together are limited to MAX_BATCH_SIZE. On any error the
+    files saved so far are deleted.
+    
+    Returns:
+        (file name, saved path, SHA-256 hex digest, ingest metrics JSON or None) for each file
+    """
+    saved = []
+    total = 0
+    try:
+        for upload in files:
+            stats = IngestionStats()
+            file_path, content_hash = await save_upload_file(upload, user_id, stats=stats)
+            try:
+                extracted = []
+                if file_path.lower().endswith('.zip'):
+                    extracted = await run_in_threadpool(
+                        extract_archive, file_path, user_id, BATCH_FILE_EXTENSIONS, max_total_size=MAX_BATCH_SIZE - total
+                    )
+                
+                if extracted:
+                    saved.extend((name, path, digest, None) for name, path, digest, _ in extracted)
+                    total += sum(size for _, _, _, size in extracted)
+                else:
+                    saved.append((os.path.basename(upload.filename), file_path, content_hash, stats.to_json()))
+                    total += stats.upload_bytes
+            except BaseException:
+                delete_file(file_path)
+                raise
+            
+            if extracted:
+                delete_file(file_path)
+            if total > MAX_BATCH_SIZE:
+                raise UploadTooLargeError(f"The upload exceeds the maximum batch size of {MAX_BATCH_SIZE / (1024 * 1024):g} MB")
+    except BaseException:
+        for _, file_path, _, _ in saved:
+            delete_file(file_path)
+        raise
+    
+    return saved
+
+@router.post("/upload/batch", response_model=BatchStatusResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    months: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload several monthly reports at once.
+    
+    Accepts several files, or zips of them, each one a workbook or a zip of
+    its CSV/Parquet export. `months` is a JSON object mapping file names to
+    "YYYY-MM"; files missing from it take the month found in their name.
+    The reports are processed concurrently, each on its own, and can be
+    followed through /batches/{batchId} or their own job id.
+    """
+    try:
+        month_mapping = json.loads(months) if months else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="months must be a JSON object mapping file names to YYYY-MM")
+    if not isinstance(month_mapping, dict):
+        raise HTTPException(status_code=400, detail="months must be a JSON object mapping file names to YYYY-MM")
+    
+    # Save everything first; a zip of workbooks is unpacked into its files
+    try:
+        saved = await save_batch_files(files, current_user.id)
+    except (UploadTooLargeError, zipfile.BadZipFile) as e:
+        status_code = 413 if isinstance(e, UploadTooLargeError) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    
+    # Files not yet handed to a report, deleted if anything fails before
+    # the reports are committed
+    pending = {file_path for _, file_path, _, _ in saved}
+    try:
+        entries = []
+        errors = []
+        for name, file_path, content_hash, metrics in saved:
+            month = month_mapping.get(name) or infer_report_month(name)
+            if not month or not MONTH_FORMAT.match(month):
+                errors.append(f"No valid month for {name}")
+            entries.append((name, file_path, content_hash, metrics, month))
+        
+        batch_months = [entry[4] for entry in entries if entry[4]]
+        errors += [f"Several files for {month}" for month in sorted(set(batch_months)) if batch_months.count(month) > 1]
+        
+        if errors or not entries:
+            raise HTTPException(status_code=400, detail="; ".join(errors) or "No report files in the upload")
+        
+        batch_id = str(uuid.uuid4())
+        reports = []
+        duplicates = []
+        for name, file_path, content_hash, metrics, month in entries:
+            existing = await find_duplicate_report(db, current_user.id, month, content_hash)
+            if existing:
+                delete_file(file_path)
+                pending.discard(file_path)
+                duplicates.append(BatchFileData(
+                    name=name, month=month, jobId=existing.job_id, reportId=existing.id,
+                    status=existing.status, duplicate=True
+                ))
+                continue
+            
+            report = Report(
+                filename=name,
+                file_path=file_path,
+                content_hash=content_hash,
+                month=month,
+                year=int(month[:4]),
+                owner_id=current_user.id,
+                status="Queued",
+                job_id=str(uuid.uuid4()),
+                batch_id=batch_id,
+                ingest_metrics=metrics
+            )
+            db.add(report)
+            reports.append(report)
+        await db.commit()
+        pending.clear()
+    finally:
+        for file_path in pending:
+            delete_file(file_path)
+    await amark_user_write(current_user.id)
+    
+    if reports:
+        try:
+            await run_in_threadpool(
+                process_report_batch.apply_async, args=[[report.id for report in reports]], task_id=batch_id
+            )
+        except Exception as e:
+            for report in reports:
+                delete_file(report.file_path)
+                await db.delete(report)
+            await db.commit()
+            raise HTTPException(status_code=503, detail=f"Error queuing files for processing: {str(e)}")
+    
+    # In eager mode the batch has already run
+    db.expire_all()
+    result = await db.execute(select(Report).where(Report.batch_id == batch_id))
+    reports = result.scalars().all()
+    
+    return await get_batch_status(batch_id, reports, duplicates)
+
+async def get_batch_status(
+    batch_id: str,
+    reports: List[Report],
+    duplicates: Optional[List[BatchFileData]] = None
+) -> BatchStatusResponse:
+    """Build the status of a batch upload from its reports and the files it linked to earlier uploads."""
+    reports = sorted(reports, key=lambda report: report.month)
+    jobs = await asyncio.gather(*(get_job_status(report) for report in reports))
+    files = [
+        BatchFileData(
+            name=report.filename, month=report.month, jobId=job.jobId, reportId=job.reportId,
+            status=job.status, progress=job.progress, error=job.error
+        )
+        for report, job in zip(reports, jobs)
+    ]
+    files += duplicates or []
+    
+    statuses = [file.status for file in files]
+    if any(status in ("Queued", "Processing") for status in statuses):
+        status = "Queued" if all(status == "Queued" for status in statuses) else "Processing"
+    else:
+        status = "Completed"
+    
+    return BatchStatusResponse(
+        success=True,
+        batchId=batch_id,
+        status=status,
+        total=len(files),
+        processed=statuses.count("Processed") + statuses.count(ARCHIVED_STATUS),
+        failed=statuses.count("Failed"),
+        files=files
+    )
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_upload_status(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(select(Report).where(
+        Report.batch_id == batch_id,
+        Report.owner_id == current_user.id
+    ))
+    reports = result.scalars().all()
+    
+    if not reports:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return await get_batch_status(batch_id, reports)
+
+def report_status(report: Report) -> str:
+    """Ingestion status of a report, also for reports from before statuses were stored."""
+    return report.status or ("Processed" if report.is_processed else "Processing")
+
+def job_progress(job_id: str) -> Optional[dict]:
+    """Progress published by a running ingestion job. Blocking: it reads the Celery result backend."""
+    try:
+        result = AsyncResult(job_id, app=process_report.app)
+        if result.state == "PROGRESS":
+            return result.info
+    except Exception:
+        # Progress is best effort; the report row holds the real status
+        pass
+    return None
+
+async def get_job_status(report: Report) -> JobStatusResponse:
+    """Build the ingestion job status of a report."""
+    progress = None
+    if report.status == "Processing" and report.job_id:
+        progress = await run_in_threadpool(job_progress, report.job_id)
+    
+    return JobStatusResponse(
+        success=True,
+        jobId=report.job_id,
+        reportId=report.id,
+        status=report_status(report),
+        progress=progress,
+        error=report.error_message
+    )
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_upload_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(select(Report).where(
+        Report.job_id == job_id,
+        Report.owner_id == current_user.id
+    ).limit(1))
+    report = result.scalars().first()
+    
+    if not report:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return await get_job_status(report)
 
 @router.get("/files", response_model=FilesResponse)
 async def get_uploaded_files(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get all reports for the current user
-    reports = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.owner_id == current_user.id
-    ).order_by(Report.upload_date.desc()).all()
-    
+    ).order_by(Report.upload_date.desc()))
+    reports = result.scalars().all()
+    
+    # Reports being processed carry the progress of their job, as on /jobs
+    processing = [report for report in reports if report.status == "Processing" and report.job_id]
+    jobs = dict(zip(
+        (report.id for report in processing),
+        await asyncio.gather(*(get_job_status(report) for report in processing))
+    ))
     files = [
         FileData(
             id=report.id,
             name=report.filename,
             uploadDate=report.upload_date.strftime("%Y-%m-%d %H:%M:%S"),
-            status="Processed" if report.is_processed else "Processing"
+            status=report_status(report),
+            jobId=report.job_id,
+            progress=jobs[report.id].progress if report.id in jobs else None,
+            metrics=json.loads(report.ingest_metrics) if report.ingest_metrics else None
         )
         for report in reports
     ]
@@ -1,41 +1,65 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 import numpy as np
 
-from ..database import get_db
+from ..database import IngestSessionLocal, get_async_db
 from ..models import User, Report, PnLData, Prediction
 from ..schemas import PredictionRequest, PredictionResponse
 from ..ml.prediction_pipeline import generate_financial_predictions
+from ..utils.cache import amark_user_write
+from ..utils.archive import ensure_rehydrated
+from .auth import get_current_user, get_read_db
 
 router = APIRouter()
 
+def run_prediction_pipeline(report_id: int, request: PredictionRequest):
+    """
+    Run the ML pipeline on a report, with a session of the ingestion pool.
+
+    Model fitting is CPU bound and the pipeline reads the P&L data with the
+    synchronous ORM, so it runs in a worker thread rather than on the event
+    loop.
+    """
+    db = IngestSessionLocal()
+    try:
+        return generate_financial_predictions(
+            report_id=report_id,
+            target=request.target,
+            periods=request.periods,
+            model_type=request.model_type,
+            scenario=request.scenario,
+            db=db
+        )
+    finally:
+        db.close()
+
 @router.post("/pnl", response_model=PredictionResponse)
 async def predict_pnl(
     request: PredictionRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == request.month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
+    db = await ensure_rehydrated(db, report)
+    
     try:
-        # Generate predictions using the ML pipeline
-        predictions, confidence_intervals, model_metrics, feature_importance = generate_financial_predictions(
-            report_id=report.id,
-            target=request.target,
-            periods=request.periods,
-            model_type=request.model_type,
-            scenario=request.scenario,
-            db=db
+        # Generate predictions using the ML pipeline, in a worker thread
+        predictions, confidence_intervals, model_metrics, feature_importance = await run_in_threadpool(
+            run_prediction_pipeline, report.id, request
         )
         
         # Save the prediction to the database
@@ -51,7 +75,8 @@ async def predict_pnl(
             feature_importance=json.dumps(feature_importance) if feature_importance else None
         )
         db.add(prediction)
-        db.commit()
+        await db.commit()
+        await amark_user_write(current_user.id)
         
         return PredictionResponse(
             success=True,
@@ -69,14 +94,15 @@ async def predict_balance_sheet(
     periods: int = 6,
     model_type: str = "xgboost",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -102,23 +128,25 @@ async def get_prediction_history(
     month: str,
     target: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Get the report for the specified month
-    report = db.query(Report).filter(
+    result = await db.execute(select(Report).where(
         Report.month == month,
         Report.owner_id == current_user.id,
         Report.is_processed == True
-    ).first()
+    ).limit(1))
+    report = result.scalars().first()
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
     # Get all predictions for the specified target
-    predictions = db.query(Prediction).filter(
+    result = await db.execute(select(Prediction).where(
         Prediction.report_id == report.id,
         Prediction.target == target
-    ).all()
+    ))
+    predictions = result.scalars().all()
     
     prediction_history = []
     for pred in predictions:
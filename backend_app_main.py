@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -7,11 +7,14 @@ import uvicorn
 
 from .database import get_db, engine
 from .models import Base
+from .migrations import run_migrations
 from .api import auth, data, predictions, chat
 from .schemas import Token
+from .utils.metrics import render_metrics
 
-# Create database tables
+# Create database tables and apply schema changes to existing ones
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Financial Management API", version="1.0.0")
 
@@ -38,5 +41,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,129 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+import logging
+
+from .utils.partitions import ensure_partitions, partition_pnl_data
+
+logger = logging.getLogger(__name__)
+
+# Base.metadata.create_all only creates missing tables. Changes to tables
+# that already exist (new columns, indexes, backfills) are applied here, in
+# order, and recorded in schema_migrations so each one runs only once.
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    """Add a column to an existing table unless it is already there."""
+    columns = [c["name"] for c in inspect(conn).get_columns(table)]
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def migrate_report_job_status(conn: Connection):
+    add_column(conn, "reports", "status", "VARCHAR")
+    add_column(conn, "reports", "job_id", "VARCHAR")
+    add_column(conn, "reports", "error_message", "TEXT")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_reports_job_id ON reports (job_id)"))
+
+    # Reports uploaded before background processing were either processed
+    # in the request or deleted on failure
+    conn.execute(text(
+        "UPDATE reports SET status = CASE WHEN is_processed THEN 'Processed' ELSE 'Failed' END "
+        "WHERE status IS NULL"
+    ))
+
+def migrate_report_content_hash(conn: Connection):
+    add_column(conn, "reports", "content_hash", "VARCHAR(64)")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_reports_content_hash ON reports (content_hash)"))
+
+def migrate_report_batch_id(conn: Connection):
+    add_column(conn, "reports", "batch_id", "VARCHAR")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_reports_batch_id ON reports (batch_id)"))
+
+def migrate_report_ingest_metrics(conn: Connection):
+    add_column(conn, "reports", "ingest_metrics", "TEXT")
+
+def migrate_lookup_indexes(conn: Connection):
+    # Reports processed twice for the same month predate the swap on
+    # upload; keep the latest one processed so the unique index can be built
+    conn.execute(text(
+        "UPDATE reports SET is_processed = :no, status = 'Superseded' "
+        "WHERE is_processed = :yes AND EXISTS ("
+        "SELECT 1 FROM reports newer WHERE newer.owner_id = reports.owner_id "
+        "AND newer.month = reports.month AND newer.is_processed = :yes AND newer.id > reports.id)"
+    ), {"yes": True, "no": False})
+    
+    processed = "is_processed" if conn.dialect.name == "postgresql" else "is_processed = 1"
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_reports_owner_month_processed ON reports (owner_id, month, is_processed)",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS uq_reports_owner_month_processed ON reports (owner_id, month) WHERE {processed}",
+        "CREATE INDEX IF NOT EXISTS ix_pnl_data_report_account ON pnl_data (report_id, account_name)",
+        "CREATE INDEX IF NOT EXISTS ix_pnl_data_report_category ON pnl_data (report_id, category)",
+        "CREATE INDEX IF NOT EXISTS ix_predictions_report_id ON predictions (report_id)",
+        "CREATE INDEX IF NOT EXISTS ix_red_flags_report_id ON red_flags (report_id)",
+        "CREATE INDEX IF NOT EXISTS ix_entity_analysis_report_id ON entity_analysis (report_id)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+def migrate_partition_pnl_data(conn: Connection):
+    # PostgreSQL only: split pnl_data into yearly partitions
+    partition_pnl_data(conn)
+
+def migrate_pnl_report_year(conn: Connection):
+    # The month columns of a sheet were all stored as 2025; they belong to
+    # the year of their report. On PostgreSQL the updated rows move to the
+    # partition of that year, through the default one if it is missing.
+    conn.execute(text(
+        "UPDATE pnl_data SET month = ("
+        "SELECT substr(reports.month, 1, 4) FROM reports WHERE reports.id = pnl_data.report_id"
+        ") || substr(month, 5) "
+        "WHERE EXISTS (SELECT 1 FROM reports WHERE reports.id = pnl_data.report_id "
+        "AND substr(reports.month, 1, 4) <> substr(pnl_data.month, 1, 4))"
+    ))
+    conn.execute(text(
+        "UPDATE pnl_series SET year = ("
+        "SELECT CAST(substr(reports.month, 1, 4) AS INTEGER) FROM reports WHERE reports.id = pnl_series.report_id"
+        ") WHERE EXISTS (SELECT 1 FROM reports WHERE reports.id = pnl_series.report_id "
+        "AND CAST(substr(reports.month, 1, 4) AS INTEGER) <> pnl_series.year)"
+    ))
+    ensure_partitions(conn)
+
+def migrate_pnl_position(conn: Connection):
+    # Rows already stored keep NULL positions and are read in id order; a
+    # re-ingestion of their report replaces them
+    add_column(conn, "pnl_data", "sheet", "VARCHAR")
+    add_column(conn, "pnl_data", "sheet_row", "INTEGER")
+
+MIGRATIONS = [
+    ("0001_report_job_status", migrate_report_job_status),
+    ("0002_report_content_hash", migrate_report_content_hash),
+    ("0003_report_batch_id", migrate_report_batch_id),
+    ("0004_report_ingest_metrics", migrate_report_ingest_metrics),
+    ("0005_lookup_indexes", migrate_lookup_indexes),
+    ("0006_partition_pnl_data", migrate_partition_pnl_data),
+    ("0007_pnl_report_year", migrate_pnl_report_year),
+    ("0008_pnl_position", migrate_pnl_position),
+]
+
+def run_migrations(engine):
+    """
+    Apply pending migrations.
+
+    Args:
+        engine: SQLAlchemy engine of the database to migrate
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    for version, migration in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+
+        logger.info(f"Applied migration {version}")
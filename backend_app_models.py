@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, LargeBinary, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -21,15 +21,30 @@ class Report(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
     file_path = Column(String)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     month = Column(String)  # Format: "YYYY-MM"
     year = Column(Integer)
     is_processed = Column(Boolean, default=False)
+    status = Column(String, default="Queued")  # Queued, Processing, Processed, Failed, Superseded, Archived
+    job_id = Column(String, unique=True, index=True)  # Celery task id of the ingestion job
+    batch_id = Column(String, index=True)  # Set for reports uploaded together in a batch
+    error_message = Column(Text)
+    ingest_metrics = Column(Text)  # IngestionStats of the upload and ingestion, as JSON
     owner_id = Column(Integer, ForeignKey("users.id"))
     
     owner = relationship("User", back_populates="reports")
     pnl_data = relationship("PnLData", back_populates="report")
     predictions = relationship("Prediction", back_populates="report")
+    
+    __table_args__ = (
+        Index("ix_reports_owner_month_processed", "owner_id", "month", "is_processed"),
+        # At most one processed report per owner and month
+        Index(
+            "uq_reports_owner_month_processed", "owner_id", "month", unique=True,
+            postgresql_where=text("is_processed"), sqlite_where=text("is_processed = 1")
+        ),
+    )
 
 class PnLData(Base):
     __tablename__ = "pnl_data"
@@ -43,8 +58,34 @@ class PnLData(Base):
     forecast = Column(Float)
     variance = Column(Float)
     variance_pct = Column(Float)
+    # The cell the row was read from: its sheet and the position of its row
+    # below the sheet's header. These order a report's rows, not the ids,
+    # which re-ingestion does not keep in sheet order. NULL for rows
+    # ingested before they were recorded, which are in id order.
+    sheet = Column(String)
+    sheet_row = Column(Integer)
     
     report = relationship("Report", back_populates="pnl_data")
+    
+    __table_args__ = (
+        Index("ix_pnl_data_report_account", "report_id", "account_name"),
+        Index("ix_pnl_data_report_category", "report_id", "category"),
+    )
+
+class PnLSeries(Base):
+    __tablename__ = "pnl_series"
+    
+    # The pnl_data rows of a report packed per account row of the sheet: a
+    # year of values per row, in sheet order (by id)
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("reports.id"))
+    account_name = Column(String)
+    category = Column(String)
+    year = Column(Integer)
+    actuals = Column(LargeBinary)  # 12 little-endian float64, January first; NaN where there is no value
+    forecast = Column(LargeBinary)  # Same layout, when the sheet has forecasts
+    
+    __table_args__ = (Index("ix_pnl_series_report_id", "report_id"),)
 
 class Prediction(Base):
     __tablename__ = "predictions"
@@ -62,6 +103,8 @@ class Prediction(Base):
     feature_importance = Column(Text)  # JSON string of feature importance
     
     report = relationship("Report", back_populates="predictions")
+    
+    __table_args__ = (Index("ix_predictions_report_id", "report_id"),)
 
 class RedFlag(Base):
     __tablename__ = "red_flags"
@@ -74,6 +117,8 @@ class RedFlag(Base):
     comment = Column(Text)
     
     report = relationship("Report")
+    
+    __table_args__ = (Index("ix_red_flags_report_id", "report_id"),)
 
 class EntityAnalysis(Base):
     __tablename__ = "entity_analysis"
@@ -91,4 +136,22 @@ class EntityAnalysis(Base):
     gpm = Column(Float)  # Gross Profit Margin
     comment = Column(Text)
     
-    report = relationship("Report")
\ No newline at end of file
+    report = relationship("Report")
+    
+    __table_args__ = (Index("ix_entity_analysis_report_id", "report_id"),)
+
+class KPIRollup(Base):
+    __tablename__ = "kpi_rollup"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    report_id = Column(Integer, ForeignKey("reports.id"))  # Processed report the figures come from
+    month = Column(String)  # Format: "YYYY-MM"
+    metric = Column(String)  # revenue, gross_profit, opex, gpm, ...
+    value = Column(Float)
+    mom = Column(Float)  # Change from the previous month: % for amounts, points for margins
+    yoy = Column(Float)  # Change from the same month a year before, likewise
+    
+    __table_args__ = (
+        Index("uq_kpi_rollup_owner_month_metric", "owner_id", "month", "metric", unique=True),
+    )
\ No newline at end of file
@@ -206,7 +206,38 @@ class FileData(BaseModel):
     name: str
     uploadDate: str
     status: str
+    jobId: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    metrics: Optional[Dict[str, Any]] = None
 
 class FilesResponse(BaseModel):
     success: bool
-    files: List[FileData]
\ No newline at end of file
+    files: List[FileData]
+
+# Ingestion job schemas
+class JobStatusResponse(BaseModel):
+    success: bool
+    jobId: str
+    reportId: int
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchFileData(BaseModel):
+    name: str
+    month: str
+    jobId: Optional[str] = None
+    reportId: Optional[int] = None
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    duplicate: bool = False
+
+class BatchStatusResponse(BaseModel):
+    success: bool
+    batchId: str
+    status: str
+    total: int
+    processed: int
+    failed: int
+    files: List[BatchFileData]
\ No newline at end of file
@@ -0,0 +1,273 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from celery_app import app as celery_app
+from .database import IngestSessionLocal
+from .models import Report, PnLData, PnLSeries, RedFlag, EntityAnalysis, Prediction, KPIRollup
+from .utils.data_processor import process_excel_file, reingest_excel_file
+from .utils.file_handler import delete_file
+from .utils.archive import rehydrate_months, delete_archive
+from .utils.cache import invalidate_user_responses, mark_user_write
+from .utils.kpi_rollup import refresh_kpi_rollup
+from .utils.series import shift_month
+from .utils.metrics import INGEST_REPORTS
+from .utils.telemetry import IngestionStats
+
+logger = logging.getLogger(__name__)
+
+# Number of reports of a batch upload ingested at the same time
+BATCH_UPLOAD_WORKERS = int(os.getenv("BATCH_UPLOAD_WORKERS", "4"))
+
+def supersede_previous_reports(db: Session, report: Report) -> List[str]:
+    """
+    Delete the processed reports that a new upload replaces.
+    
+    A user keeps one processed report per month: when a changed workbook
+    is uploaded for a month, the previous report and all of its data are
+    removed. Nothing is committed here, so the caller can swap the reports
+    in a single transaction.
+    
+    Args:
+        db: Database session
+        report: The newly processed report
+        
+    Returns:
+        File paths of the removed reports, to be deleted after the commit
+    """
+    previous = db.query(Report).filter(
+        Report.owner_id == report.owner_id,
+        Report.month == report.month,
+        Report.is_processed == True,
+        Report.id != report.id
+    ).all()
+    
+    if not previous:
+        return []
+    
+    previous_ids = [old.id for old in previous]
+    for model in (PnLData, PnLSeries, RedFlag, EntityAnalysis, Prediction, KPIRollup):
+        db.query(model).filter(model.report_id.in_(previous_ids)).delete(synchronize_session=False)
+    
+    file_paths = [old.file_path for old in previous]
+    for old in previous:
+        db.delete(old)
+    
+    # Delete before the new report is marked processed: the unique index
+    # on processed reports per owner and month is checked row by row
+    db.flush()
+    
+    logger.info(f"Report {report.id} replaces reports {previous_ids} for {report.month}")
+    return file_paths
+
+def merge_upload_into_report(db: Session, upload: Report, target: Report) -> List[str]:
+    """
+    Fold a re-upload into the report it corrects.
+    
+    After the corrected data has been re-ingested into the target report,
+    the target takes over the upload's file, hash and job id, and the
+    placeholder report created for the upload is removed. Nothing is
+    committed here.
+    
+    Args:
+        db: Database session
+        upload: Placeholder report created for the re-upload
+        target: Existing processed report for the same month
+        
+    Returns:
+        File paths that are no longer referenced, to be deleted after the commit
+    """
+    replaced_files = [target.file_path]
+    job_id = upload.job_id
+    
+    target.filename = upload.filename
+    target.file_path = upload.file_path
+    target.content_hash = upload.content_hash
+    target.upload_date = upload.upload_date
+    target.batch_id = upload.batch_id
+    target.ingest_metrics = upload.ingest_metrics
+    target.error_message = None
+    
+    # job_id is unique, so release it before handing it over
+    upload.job_id = None
+    db.flush()
+    target.job_id = job_id
+    db.delete(upload)
+    
+    return replaced_files + supersede_previous_reports(db, target)
+
+def rehydrate_compared_months(db: Session, report: Report) -> List[str]:
+    """
+    Rehydrate the archived reports that the ingestion of a report reads.
+
+    Those are the report it may correct, for the same month, and the
+    reports its KPI rollup is computed with, up to a year either side.
+    They are also kept from being archived until the next commit.
+    
+    Returns:
+        Archives to delete after the commit
+    """
+    return rehydrate_months(db, report.owner_id, shift_month(report.month, -12), shift_month(report.month, 12))
+
+def ingest_report(
+    report_id: int,
+    progress: Optional[Callable[[str, int, int], None]] = None
+) -> Optional[Dict[str, int]]:
+    """
+    Ingest an uploaded report.
+    
+    The report's status moves from Queued to Processing and then to
+    Processed or Failed. The report is ingested in a session of its own,
+    and its data, the swap with the report it replaces and its KPI rollup
+    are committed together, so a failure only affects this report and
+    leaves nothing of it behind.
+    Timings and counts of the ingestion are added to the report's
+    ingest_metrics, which already hold those of the file upload.
+    
+    Args:
+        report_id: ID of the report to process
+        progress: Called as progress(sheet_name, done, total) after each sheet
+        
+    Returns:
+        Change summary when the upload corrected an existing report
+    """
+    db = IngestSessionLocal()
+    try:
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if not report:
+            logger.warning(f"Report {report_id} not found, skipping ingestion")
+            return
+        
+        report.status = "Processing"
+        db.commit()
+        
+        # A re-upload for a month that already has a processed report only
+        # writes the cells that changed into that report
+        previous = db.query(Report).filter(
+            Report.owner_id == report.owner_id,
+            Report.month == report.month,
+            Report.is_processed == True,
+            Report.id != report.id
+        ).order_by(Report.upload_date.desc()).first()
+        
+        summary = None
+        stats = IngestionStats.from_json(report.ingest_metrics)
+        try:
+            archives = rehydrate_compared_months(db, report)
+            if previous:
+                summary = reingest_excel_file(report.file_path, previous.id, db, progress=progress, stats=stats, commit=False)
+                replaced_files = merge_upload_into_report(db, report, previous)
+            else:
+                process_excel_file(report.file_path, report.id, db, progress=progress, stats=stats, commit=False)
+                # Swap out any older report for the month in the same transaction
+                replaced_files = supersede_previous_reports(db, report)
+                report.is_processed = True
+                report.status = "Processed"
+            
+            # The month's KPIs, and those of the months compared with it, are
+            # published with the report
+            owner_id = report.owner_id
+            db.flush()
+            archives += rehydrate_compared_months(db, report)
+            refresh_kpi_rollup(db, owner_id, report.month)
+            
+            report.ingest_metrics = stats.to_json()
+            db.commit()
+        except Exception as e:
+            # Nothing of the ingestion is committed: its data, the swap and
+            # the rehydrated reports are all rolled back
+            db.rollback()
+            report.status = "Failed"
+            report.error_message = str(e)
+            report.ingest_metrics = stats.to_json()
+            db.commit()
+            delete_file(report.file_path)
+            INGEST_REPORTS.labels(status="Failed").inc()
+            raise
+        
+        # The user's dashboards and analyses now read the new report: from
+        # the primary until the replicas have it, so that it is not cached
+        # from a replica that lags behind
+        mark_user_write(owner_id)
+        invalidate_user_responses(owner_id)
+        
+        for file_path in replaced_files:
+            delete_file(file_path)
+        for path in archives:
+            delete_archive(path)
+        
+        INGEST_REPORTS.labels(status="Processed").inc()
+        logger.info(f"Report {report_id} processed: {stats.to_json()}")
+        return summary
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, name="app.tasks.process_report")
+def process_report(self, report_id: int):
+    """
+    Ingest an uploaded report in the background.
+    
+    While sheets are being parsed, progress is published as the task's
+    PROGRESS state.
+    
+    Args:
+        report_id: ID of the report to process
+        
+    Returns:
+        Change summary when the upload corrected an existing report
+    """
+    def publish_progress(sheet_name: str, done: int, total: int):
+        if self.request.called_directly or self.request.is_eager:
+            return
+        self.update_state(state="PROGRESS", meta={"sheet": sheet_name, "done": done, "total": total})
+    
+    return ingest_report(report_id, publish_progress)
+
+@celery_app.task(bind=True, name="app.tasks.process_report_batch")
+def process_report_batch(self, report_ids: List[int], workers: int = BATCH_UPLOAD_WORKERS):
+    """
+    Ingest the reports of a batch upload concurrently.
+    
+    At most `workers` reports are ingested at a time. Each one is ingested
+    and committed on its own, so a file that fails is marked Failed while
+    the others go through. The sheet progress of each file is published
+    under that file's job id, so it can be followed like a single upload.
+    
+    Args:
+        report_ids: IDs of the reports created for the batch
+        workers: Maximum number of reports ingested at the same time
+        
+    Returns:
+        Number of processed and failed reports
+    """
+    db = IngestSessionLocal()
+    try:
+        job_ids = dict(db.query(Report.id, Report.job_id).filter(Report.id.in_(report_ids)).all())
+    finally:
+        db.close()
+    
+    def progress_for(job_id: Optional[str]):
+        def publish_progress(sheet_name: str, done: int, total: int):
+            if not job_id or self.request.called_directly or self.request.is_eager:
+                return
+            self.update_state(task_id=job_id, state="PROGRESS", meta={"sheet": sheet_name, "done": done, "total": total})
+        return publish_progress
+    
+    def ingest(report_id: int) -> bool:
+        try:
+            ingest_report(report_id, progress_for(job_ids.get(report_id)))
+            return True
+        except Exception as e:
+            # The report is already marked Failed; keep going with the others
+            logger.error(f"Report {report_id} failed in batch {self.request.id}: {str(e)}")
+            return False
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(report_ids)))) as executor:
+        results = list(executor.map(ingest, report_ids))
+    
+    summary = {"processed": results.count(True), "failed": results.count(False)}
+    logger.info(f"Batch {self.request.id} done: {summary}")
+    return summary
\ No newline at end of file
@@ -0,0 +1,266 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import List, Optional
+
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import AsyncSessionLocal, SessionLocal
+from ..models import Report, PnLData, PnLSeries, RedFlag, EntityAnalysis, KPIRollup
+from .bulk_writer import BulkWriter
+from .cache import amark_user_write
+from .metrics import REPORT_ARCHIVE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Directory of the archived reports: one directory per report, holding a
+# Parquet file per table
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# Reports of months at least this many months before the current one are archived
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+
+ARCHIVED_STATUS = "Archived"
+
+# The rows of a report that are archived. Its predictions and KPI rollup
+# stay: they are small, and the rollup keeps dashboards and historical
+# benchmarks of later months working without the archived rows.
+ARCHIVE_MODELS = (PnLData, PnLSeries, RedFlag, EntityAnalysis)
+
+# Rehydrations of this process, one at a time; across processes the
+# report's row lock orders them
+_rehydrate_lock = threading.Lock()
+
+def archive_dir(report: Report) -> str:
+    return os.path.join(ARCHIVE_DIR, str(report.owner_id), str(report.id))
+
+def delete_archive(path: str):
+    """Delete the archive of a report once its rows are back in the database."""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"Archive deleted: {path}")
+
+def archive_report(db: Session, report: Report) -> str:
+    """
+    Move the rows of a processed report to Parquet files.
+
+    Each table's rows are written, ids included, to a compressed Parquet
+    file, then deleted from the database, and the report is marked
+    Archived; it stays the processed report of its month. Nothing is
+    committed here: if the commit fails, delete the returned archive.
+
+    Args:
+        db: Database session
+        report: The report, locked by the caller
+
+    Returns:
+        Path of the report's archive
+    """
+    start = time.perf_counter()
+    path = archive_dir(report)
+    os.makedirs(path, exist_ok=True)
+
+    for model in ARCHIVE_MODELS:
+        table = model.__table__
+        result = db.execute(select(table).where(table.c.report_id == report.id).order_by(table.c.id))
+        frame = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+        file_path = os.path.join(path, f"{table.name}.parquet")
+        frame.to_parquet(f"{file_path}.tmp", compression=ARCHIVE_COMPRESSION, index=False)
+        os.replace(f"{file_path}.tmp", file_path)
+
+        db.execute(table.delete().where(table.c.report_id == report.id))
+
+    report.status = ARCHIVED_STATUS
+    REPORT_ARCHIVE_SECONDS.labels(operation="archive").observe(time.perf_counter() - start)
+    return path
+
+def rehydrate_report(db: Session, report: Report) -> str:
+    """
+    Load the rows of an archived report back into the database.
+
+    The rows keep their ids, so they come back in their original order,
+    and the report is marked Processed again. Nothing is committed here;
+    delete the returned archive after the commit.
+
+    Args:
+        db: Database session
+        report: The archived report, locked by the caller
+
+    Returns:
+        Path of the report's archive
+    """
+    start = time.perf_counter()
+    path = archive_dir(report)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Archive of report {report.id} not found: {path}")
+
+    writer = BulkWriter(db)
+    year = report.month[:4]
+    for model in ARCHIVE_MODELS:
+        frame = pd.read_parquet(os.path.join(path, f"{model.__tablename__}.parquet"))
+        # Archives written before the P&L months took the report's year
+        # hold them as 2025 (see migration 0007_pnl_report_year)
+        if model is PnLData:
+            frame["month"] = year + frame["month"].str[4:]
+        elif model is PnLSeries:
+            frame["year"] = int(year)
+        writer.add_columns(model, {
+            column: values.astype(object).where(values.notna(), None).tolist()
+            for column, values in frame.items()
+        })
+    writer.flush()
+
+    report.status = "Processed"
+    REPORT_ARCHIVE_SECONDS.labels(operation="rehydrate").observe(time.perf_counter() - start)
+    logger.info(f"Report {report.id} rehydrated from {path}")
+    return path
+
+def rehydrate_months(db: Session, owner_id: int, first_month: str, last_month: str) -> List[str]:
+    """
+    Rehydrate the archived reports of a user in a range of months, and keep
+    the range's reports from being archived until the transaction ends.
+
+    Ingestion reads the stored rows of the report it corrects and those of
+    the months its KPIs are compared with. Nothing is committed here.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        first_month: First month of the range, in "YYYY-MM" format
+        last_month: Last month of the range, in "YYYY-MM" format
+
+    Returns:
+        Paths of the archives to delete after the commit
+    """
+    def in_range(query):
+        return query.filter(
+            Report.owner_id == owner_id,
+            Report.is_processed == True,
+            Report.month >= first_month,
+            Report.month <= last_month
+        ).order_by(Report.id)
+
+    archived = in_range(db.query(Report)).filter(Report.status == ARCHIVED_STATUS).with_for_update().all()
+    paths = [rehydrate_report(db, report) for report in archived]
+
+    # The archiving job locks a report before it archives it
+    in_range(db.query(Report.id)).with_for_update(read=True).all()
+    return paths
+
+def rehydrate_archived_report(report_id: int) -> bool:
+    """
+    Rehydrate an archived report and commit, in a session of its own.
+
+    Returns:
+        Whether the report was rehydrated here, rather than already back
+    """
+    with _rehydrate_lock:
+        db = SessionLocal()
+        try:
+            report = db.query(Report).filter(
+                Report.id == report_id,
+                Report.status == ARCHIVED_STATUS
+            ).with_for_update().first()
+            if report is None:
+                return False
+
+            path = rehydrate_report(db, report)
+            db.commit()
+        finally:
+            db.close()
+
+    delete_archive(path)
+    return True
+
+async def ensure_rehydrated(db: AsyncSession, report: Report) -> AsyncSession:
+    """
+    Bring an archived report's rows back before an endpoint reads them.
+
+    The rows are restored on the primary, and the user then reads from the
+    primary for a while (see mark_user_write). A request whose session is
+    on a replica moves to the primary too, rather than waiting in the
+    request for the replica to replay the rows: the endpoint reads with the
+    returned session from here on. get_read_db closes it with the request.
+
+    Args:
+        db: The request's database session
+        report: The report the endpoint reads, loaded in that session
+
+    Returns:
+        The session to read the report's rows with
+    """
+    if report.status != ARCHIVED_STATUS:
+        return db
+
+    await run_in_threadpool(rehydrate_archived_report, report.id)
+    await amark_user_write(report.owner_id)
+
+    if not db.info.get("replica"):
+        await db.refresh(report)
+        return db
+
+    primary_session = db.info.get("primary_session")
+    if primary_session is None:
+        primary_session = db.info["primary_session"] = AsyncSessionLocal()
+    return primary_session
+
+def archive_reports(db: Session, before_month: str, owner_id: Optional[int] = None) -> List[int]:
+    """
+    Archive the processed reports of the months before before_month.
+
+    Only reports whose KPI rollup has been built are archived, as the later
+    months' dashboards read their figures from it. Each report is archived
+    in a transaction of its own; one that changed since it was selected
+    (rehydrated, replaced) is skipped.
+
+    Args:
+        db: Database session
+        before_month: First month that is kept, in "YYYY-MM" format
+        owner_id: Only archive this user's reports
+
+    Returns:
+        IDs of the archived reports
+    """
+    query = db.query(Report.id).filter(
+        Report.is_processed == True,
+        Report.status == "Processed",
+        Report.month < before_month,
+        db.query(KPIRollup.id).filter(KPIRollup.report_id == Report.id).exists()
+    )
+    if owner_id is not None:
+        query = query.filter(Report.owner_id == owner_id)
+    report_ids = [report_id for (report_id,) in query.order_by(Report.id)]
+    db.rollback()
+
+    archived = []
+    for report_id in report_ids:
+        report = db.query(Report).filter(
+            Report.id == report_id,
+            Report.is_processed == True,
+            Report.status == "Processed"
+        ).with_for_update().first()
+        if report is None:
+            db.rollback()
+            continue
+
+        month = report.month
+        path = archive_report(db, report)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            delete_archive(path)
+            raise
+
+        archived.append(report_id)
+        logger.info(f"Report {report_id} ({month}) archived to {path}")
+    return archived
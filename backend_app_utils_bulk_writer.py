@@ -0,0 +1,168 @@
+import csv
+import io
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "5000"))
+BULK_INSERT_USE_COPY = os.getenv("BULK_INSERT_USE_COPY", "true").lower() in ("1", "true", "yes")
+
+# NULL marker used in the COPY stream so that empty strings stay empty strings
+COPY_NULL = "\\N"
+
+def copy_value(value: Any) -> Any:
+    """A value as written in the CSV stream of COPY; bytes use the hex format of bytea."""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, bytes):
+        return "\\x" + value.hex()
+    return value
+
+class BulkWriter:
+    """
+    Collect parsed rows into columnar batches and write them in bulk.
+
+    Rows are buffered per table as one list per column and written with a
+    multi-row INSERT, or with COPY when the session is bound to PostgreSQL.
+    Everything is written on the session's own connection and nothing is
+    committed here, so a rollback of the session discards the rows too.
+
+    A writer created without a session only collects the batches, which
+    lets the parsing run where no database is available.
+    """
+
+    def __init__(self, db: Optional[Session], batch_size: int = BULK_INSERT_BATCH_SIZE,
+                 use_copy: bool = BULK_INSERT_USE_COPY):
+        self.db = db
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.batches: Dict[str, Dict[str, List[Any]]] = {}
+        self.rows_added: Dict[str, int] = {}
+        self.rows_written: Dict[str, int] = {}
+        self.write_seconds: Dict[str, float] = {}
+        self._tables = {}
+
+    def add(self, model, **values):
+        """Buffer a single row for the table of the given model."""
+        columns = self._columns_for(model, values.keys())
+        for key, value in values.items():
+            columns[key].append(value)
+        self._count(model.__tablename__, 1)
+
+        if self.pending(model.__tablename__) >= self.batch_size:
+            self.flush(model.__tablename__)
+
+    def add_columns(self, model, columns: Dict[str, Sequence[Any]]):
+        """Buffer several rows at once, given as one sequence per column."""
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns for {model.__tablename__} have different lengths")
+
+        buffered = self._columns_for(model, columns.keys())
+        for key, values in columns.items():
+            buffered[key].extend(values)
+        self._count(model.__tablename__, lengths.pop() if lengths else 0)
+
+        if self.pending(model.__tablename__) >= self.batch_size:
+            self.flush(model.__tablename__)
+
+    def pending(self, table: str) -> int:
+        """Number of rows buffered but not yet written for a table."""
+        columns = self.batches.get(table)
+        if not columns:
+            return 0
+        return len(next(iter(columns.values())))
+
+    def flush(self, table: Optional[str] = None):
+        """
+        Write the buffered rows.
+
+        Args:
+            table: Only flush this table; all tables are flushed if omitted
+        """
+        if self.db is None:
+            return
+
+        tables = [table] if table else list(self.batches)
+        for name in tables:
+            count = self.pending(name)
+            if count == 0:
+                continue
+
+            columns = self.batches[name]
+            start = time.perf_counter()
+
+            for offset in range(0, count, self.batch_size):
+                chunk = {key: values[offset:offset + self.batch_size] for key, values in columns.items()}
+                if self._can_copy():
+                    self._copy_chunk(self._tables[name], chunk)
+                else:
+                    self._insert_chunk(self._tables[name], chunk)
+
+            elapsed = time.perf_counter() - start
+            self.rows_written[name] = self.rows_written.get(name, 0) + count
+            self.write_seconds[name] = self.write_seconds.get(name, 0.0) + elapsed
+            self.batches[name] = {key: [] for key in columns}
+
+            rate = count / elapsed if elapsed > 0 else float("inf")
+            logger.debug(f"Bulk wrote {count} rows to {name} in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Rows written, time spent and throughput for each table."""
+        stats = {}
+        for name, rows in self.rows_written.items():
+            seconds = self.write_seconds.get(name, 0.0)
+            stats[name] = {
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_sec": rows / seconds if seconds > 0 else 0.0
+            }
+        return stats
+
+    def _count(self, table: str, rows: int):
+        self.rows_added[table] = self.rows_added.get(table, 0) + rows
+
+    def _columns_for(self, model, keys) -> Dict[str, List[Any]]:
+        table = model.__tablename__
+        self._tables[table] = model.__table__
+        columns = self.batches.get(table)
+
+        if not columns:
+            columns = {key: [] for key in keys}
+            self.batches[table] = columns
+        elif set(keys) != set(columns):
+            raise ValueError(f"Inconsistent columns for {table}: {sorted(keys)} != {sorted(columns)}")
+
+        return columns
+
+    def _can_copy(self) -> bool:
+        return self.use_copy and self.db.get_bind().dialect.name == "postgresql"
+
+    def _insert_chunk(self, table, chunk: Dict[str, List[Any]]):
+        # executemany with a list of parameter sets becomes a multi-row INSERT
+        keys = list(chunk)
+        records = [dict(zip(keys, values)) for values in zip(*chunk.values())]
+        self.db.execute(table.insert(), records)
+
+    def _copy_chunk(self, table, chunk: Dict[str, List[Any]]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for values in zip(*chunk.values()):
+            writer.writerow([copy_value(value) for value in values])
+        buffer.seek(0)
+
+        # Use the session's connection so COPY runs inside the same transaction
+        connection = self.db.connection().connection
+        cursor = connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(chunk)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+        finally:
+            cursor.close()
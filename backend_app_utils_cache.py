@@ -0,0 +1,290 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+import hashlib
+import inspect
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from .metrics import RESPONSE_CACHE_REQUESTS, RESPONSE_CACHE_INVALIDATIONS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is served for; 0 disables the cache
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# Responses kept by the in-process cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+# Redis shared by the API and the worker, so that the worker's invalidations
+# reach the API; without one, each process caches on its own (tests, local runs)
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", os.getenv("REDIS_URL", ""))
+
+# Seconds after a write during which a user reads from the primary
+# database rather than from a replica that may lag behind it
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "30"))
+
+KEY_PREFIX = "response_cache"
+
+def initial_generation() -> int:
+    """
+    First generation of a user whose generation is not stored.
+
+    Generations also make the ETags of the responses; starting them at
+    random rather than at 0 keeps a restarted process (or a flushed Redis)
+    from handing out the tags of responses computed before it.
+    """
+    return random.getrandbits(48)
+
+class MemoryCache:
+    """
+    In-process cache with a TTL per entry and LRU eviction.
+
+    The a-prefixed methods are the ones request handlers await, as with
+    RedisCache; here they never block, so they just call the others.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def generation(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            return self._generations.setdefault(user_id, initial_generation())
+
+    def bump_generation(self, user_id: int):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, initial_generation()) + 1
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def aset(self, key: str, body: bytes, ttl: int):
+        self.set(key, body, ttl)
+
+    async def ageneration(self, user_id: int) -> Optional[int]:
+        return self.generation(user_id)
+
+class RedisCache:
+    """
+    Cache in Redis, with a TTL per entry.
+
+    Entries are evicted by Redis under its maxmemory policy (volatile-lru
+    in docker-compose, which only evicts keys with a TTL such as these). Redis
+    errors are logged and treated as misses, so the endpoints keep working
+    without the cache.
+
+    The worker uses the blocking client; request handlers await the
+    a-prefixed methods, which go through an asyncio client so that a slow
+    Redis never holds up the event loop.
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._url = url
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def _async_client(self):
+        """The asyncio client of the running event loop, whose connections only work in that loop."""
+        import redis.asyncio
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = redis.asyncio.Redis.from_url(self._url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            self._async_clients[loop] = client
+        return client
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._client.get(key)
+        except self._errors as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key: str, body: bytes, ttl: int):
+        try:
+            self._client.set(key, body, ex=ttl)
+        except self._errors as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def generation(self, user_id: int) -> Optional[int]:
+        """The user's generation, or None when it cannot be read (the response is then not cached)."""
+        key = f"{KEY_PREFIX}:generation:{user_id}"
+        try:
+            generation = self._client.get(key)
+            if generation is None:
+                self._client.set(key, initial_generation(), nx=True)
+                generation = self._client.get(key)
+            return int(generation)
+        except self._errors as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def bump_generation(self, user_id: int):
+        try:
+            self._client.incr(f"{KEY_PREFIX}:generation:{user_id}")
+        except self._errors as e:
+            logger.error(f"Could not invalidate the cached responses of user {user_id}: {e}")
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._async_client.get(key)
+        except self._errors as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    async def aset(self, key: str, body: bytes, ttl: int):
+        try:
+            await self._async_client.set(key, body, ex=ttl)
+        except self._errors as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    async def ageneration(self, user_id: int) -> Optional[int]:
+        key = f"{KEY_PREFIX}:generation:{user_id}"
+        try:
+            generation = await self._async_client.get(key)
+            if generation is None:
+                await self._async_client.set(key, initial_generation(), nx=True)
+                generation = await self._async_client.get(key)
+            return int(generation)
+        except self._errors as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """The process's response cache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RedisCache(RESPONSE_CACHE_URL) if RESPONSE_CACHE_URL else MemoryCache(RESPONSE_CACHE_SIZE)
+        return _cache
+
+def response_cache_key(user_id: int, generation: int, endpoint: str, params: Dict[str, Any]) -> str:
+    query = urlencode(sorted((name, value) for name, value in params.items() if value is not None))
+    return f"{KEY_PREFIX}:{user_id}:{generation}:{endpoint}?{query}"
+
+def response_etag(key: str) -> str:
+    """Strong ETag of the response cached under key: the same key always gives the same body."""
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 7232 specifies for it)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def invalidate_user_responses(user_id: int):
+    """
+    Drop the cached responses of a user.
+
+    The user's generation, part of every cache key, is incremented, so
+    older entries are no longer looked up and expire with their TTL.
+    """
+    get_cache().bump_generation(user_id)
+    RESPONSE_CACHE_INVALIDATIONS.inc()
+
+def mark_user_write(user_id: int):
+    """Send the reads of a user who just wrote to the primary database for READ_YOUR_WRITES_SECONDS."""
+    get_cache().set(f"{KEY_PREFIX}:primary:{user_id}", b"1", READ_YOUR_WRITES_SECONDS)
+
+async def amark_user_write(user_id: int):
+    """mark_user_write, for request handlers."""
+    await get_cache().aset(f"{KEY_PREFIX}:primary:{user_id}", b"1", READ_YOUR_WRITES_SECONDS)
+
+async def has_recent_write(user_id: int) -> bool:
+    """Whether a user wrote within READ_YOUR_WRITES_SECONDS (see mark_user_write)."""
+    return await get_cache().aget(f"{KEY_PREFIX}:primary:{user_id}") is not None
+
+def cached_response(endpoint: str, params: Sequence[str]):
+    """
+    Cache the JSON response of a read endpoint per user and query, and tag it with an ETag.
+
+    The endpoint must take current_user; params names the query parameters
+    its response depends on. The ETag is derived from the user's generation
+    and the query, so a request whose If-None-Match holds it is answered
+    304 Not Modified before the endpoint runs. Other cached responses are
+    served as is, without running the endpoint or serializing its result
+    again. Errors (HTTPException) are neither cached nor tagged.
+
+    Args:
+        endpoint: Name of the endpoint, for the cache key and the request counters
+        params: Names of the endpoint's query parameters
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, request: Request, **kwargs):
+            cache = get_cache()
+            user_id = kwargs["current_user"].id
+            generation = await cache.ageneration(user_id)
+            if generation is None:
+                return await handler(*args, **kwargs)
+
+            key = response_cache_key(user_id, generation, endpoint, {name: kwargs.get(name) for name in params})
+            headers = {"ETag": response_etag(key), "Cache-Control": "private, no-cache"}
+            if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+                RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result="not_modified").inc()
+                return Response(status_code=304, headers=headers)
+
+            if RESPONSE_CACHE_TTL > 0:
+                body = await cache.aget(key)
+                if body is not None:
+                    RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result="hit").inc()
+                    return Response(content=body, media_type="application/json", headers=headers)
+
+            RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result="miss").inc()
+            result = await handler(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+
+            response = JSONResponse(content=jsonable_encoder(result), headers=headers)
+            if RESPONSE_CACHE_TTL > 0:
+                await cache.aset(key, response.body, RESPONSE_CACHE_TTL)
+            return response
+
+        # FastAPI reads the parameters from the signature: the endpoint's,
+        # plus the request for its If-None-Match header
+        signature = inspect.signature(handler)
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        ])
+        return wrapper
+    return decorator
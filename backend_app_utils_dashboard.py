@@ -0,0 +1,109 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import RedFlag, EntityAnalysis
+from ..schemas import DashboardResponse, KPIData, MonthlyData, EntityData, RedFlagData
+from .kpi_rollup import load_kpi_series
+
+# Months of the monthly chart, the dashboard's month included
+MONTHLY_WINDOW = 12
+
+KPI_METRICS = ("revenue", "gross_profit", "opex", "net_profit", "gpm", "opm", "npm")
+
+def build_dashboard(db: Session, owner_id: int, month: str) -> Optional[DashboardResponse]:
+    """
+    Build the dashboard of a month.
+
+    The KPIs of the month and the eleven before it, with their changes
+    from the previous month, are read from the KPI rollup in one query,
+    then the entities and red flags of the month's report: three queries
+    in all.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        month: Month in "YYYY-MM" format
+
+    Returns:
+        The dashboard, or None if the user has no processed report for the month
+    """
+    series = load_kpi_series(db, owner_id, month, MONTHLY_WINDOW, KPI_METRICS)
+    report_id = series.report_id(month)
+    if report_id is None:
+        return None
+
+    # Calculate KPIs
+    revenue_amount = series.get(month, "revenue", 0)
+    revenue_change = series.get_mom(month, "revenue", 0)
+
+    gpm = series.get(month, "gpm", 0)
+    gpm_change = series.get_mom(month, "gpm", 0)
+
+    opex_amount = series.get(month, "opex", 0)
+    opex_change = series.get_mom(month, "opex", 0)
+
+    net_profit_amount = series.get(month, "net_profit", 0)
+    net_profit_change = series.get_mom(month, "net_profit", 0)
+
+    kpi_data = KPIData(
+        revenue=revenue_amount,
+        revenueChange=revenue_change,
+        gpm=gpm,
+        gpmChange=gpm_change,
+        opex=opex_amount,
+        opexChange=opex_change,
+        netProfit=net_profit_amount,
+        netProfitChange=net_profit_change
+    )
+
+    monthly_data = []
+    # Newest month first
+    for month_str in reversed(series.months):
+        if series.report_id(month_str) is None:
+            continue
+
+        month_revenue = series.get(month_str, "revenue", 0)
+        month_gross_profit = series.get(month_str, "gross_profit", 0)
+        month_net_profit = series.get(month_str, "net_profit", 0)
+
+        monthly_data.append(MonthlyData(
+            month=month_str,
+            revenue=month_revenue,
+            grossProfit=month_gross_profit,
+            netProfit=month_net_profit,
+            gpm=series.get(month_str, "gpm", 0),
+            opm=series.get(month_str, "opm", 0),
+            npm=series.get(month_str, "npm", 0)
+        ))
+
+    entities = db.query(EntityAnalysis).filter(EntityAnalysis.report_id == report_id).all()
+    entity_data = [
+        EntityData(
+            entity=entity.entity_name,
+            revenue=entity.total_revenue,
+            cost=entity.total_cost,
+            gp=entity.gross_profit,
+            gpm=entity.gpm
+        )
+        for entity in entities
+    ]
+
+    red_flags = db.query(RedFlag).filter(RedFlag.report_id == report_id).all()
+    red_flag_data = [
+        RedFlagData(
+            project=flag.project_name,
+            country=flag.country,
+            gpm=flag.gpm,
+            comment=flag.comment
+        )
+        for flag in red_flags
+    ]
+
+    return DashboardResponse(
+        success=True,
+        kpi=kpi_data,
+        monthly=monthly_data,
+        entities=entity_data,
+        redFlags=red_flag_data
+    )
@@ -1,93 +1,630 @@
 import pandas as pd
 import numpy as np
+from openpyxl import load_workbook
 from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import multiprocessing
+import threading
 import logging
+import zipfile
+import time
+import os
 
-from ..models import Report, PnLData, RedFlag, EntityAnalysis
+from ..models import Report, PnLData, PnLSeries, RedFlag, EntityAnalysis
+from .bulk_writer import BulkWriter, BULK_INSERT_BATCH_SIZE
+from .tabular_reader import is_tabular_source, tabular_sheets, read_tabular_sheet
+from .layout_detector import detect_layout, find_layout, SheetLayout, HEADER_SCAN_ROWS
+from .pnl_series import pack_pnl_series
+from .telemetry import IngestionStats, record_rejected, timed
 
 logger = logging.getLogger(__name__)
 
-def process_excel_file(file_path: str, report_id: int, db: Session):
+# Number of processes used to parse the sheets of a workbook in parallel;
+# 1 parses them one after another in the calling process
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# Each worker reloads the workbook, so workbooks whose sheets take less
+# uncompressed space than this are parsed sequentially even with
+# INGEST_WORKERS > 1; see scripts/benchmark_parallel_parse.py for how the
+# default was chosen
+INGEST_PARALLEL_MIN_SIZE = int(float(os.getenv("INGEST_PARALLEL_MIN_SIZE_MB", "8")) * 1024 * 1024)
+
+# Tables written by the sheet processors, by table name
+INGEST_MODELS = {model.__tablename__: model for model in (PnLData, PnLSeries, RedFlag, EntityAnalysis)}
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+def process_excel_file(
+    file_path: str,
+    report_id: int,
+    db: Session,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    workers: int = INGEST_WORKERS,
+    stats: Optional[IngestionStats] = None,
+    commit: bool = True
+):
     """
     Process an Excel file and store the data in the database.
     
+    The file can also be a CSV/Parquet export of the workbook's sheets: a
+    single file or a zip of files (see tabular_sheets).
+    
+    With commit=False the data is only flushed, and the caller commits it
+    with its own changes or rolls it back.
+    
     Args:
         file_path: Path to the Excel file
         report_id: ID of the report to associate the data with
         db: Database session
+        batch_size: Number of rows per bulk insert batch
+        progress: Called as progress(sheet_name, done, total) after each sheet
+        workers: Number of processes parsing sheets in parallel
+        stats: Receives the stage and sheet timings, row counts and peak memory
+        commit: Whether to commit the data, or roll back on failure
     """
-    try:
-        # Read all sheets from the Excel file
-        excel_file = pd.ExcelFile(file_path)
+    stats = stats if stats is not None else IngestionStats()
+    with stats.memory():
+        try:
+            year = report_year(db, report_id)
+            writer = BulkWriter(db, batch_size=batch_size)
+            start = time.perf_counter()
+            read_workbook(file_path, report_id, year, writer, progress, workers, stats)
+            
+            # Batches that filled up were already written while parsing
+            stats.add_stage("parse", time.perf_counter() - start - sum(writer.write_seconds.values()))
+            
+            # Write the remaining batches and commit everything at once
+            writer.flush()
+            stats.add_stage("db_write", sum(writer.write_seconds.values()))
+            if commit:
+                with stats.stage("commit"):
+                    db.commit()
+            
+            table_stats = writer.stats()
+            stats.record_rows({table: values['rows'] for table, values in table_stats.items()})
+            
+            for table, values in table_stats.items():
+                logger.info(f"Inserted {values['rows']} rows into {table} ({values['rows_per_sec']:,.0f} rows/sec)")
+            logger.info(f"Successfully processed Excel file: {file_path}")
+            
+        except Exception as e:
+            if commit:
+                db.rollback()
+            logger.error(f"Error processing Excel file: {str(e)}")
+            raise
+
+def reingest_excel_file(
+    file_path: str,
+    report_id: int,
+    db: Session,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    workers: int = INGEST_WORKERS,
+    stats: Optional[IngestionStats] = None,
+    commit: bool = True
+) -> Dict[str, int]:
+    """
+    Re-ingest a corrected Excel file into an existing report.
+    
+    The parsed P&L records are compared with the stored ones cell by cell,
+    by sheet, row and month, and only the cells that differ are inserted,
+    updated in place or deleted, so the other rows keep their ids. Red flag and
+    entity rows have no natural key and are few, so they are replaced, as
+    are the packed P&L series.
+    
+    With commit=False the changes are only flushed, and the caller commits
+    them with its own changes or rolls them back.
+    
+    Args:
+        file_path: Path to the corrected Excel file
+        report_id: ID of the report whose data is updated
+        db: Database session
+        batch_size: Number of rows per bulk insert batch
+        progress: Called as progress(sheet_name, done, total) after each sheet
+        workers: Number of processes parsing sheets in parallel
+        stats: Receives the stage and sheet timings, row counts and peak memory
+        commit: Whether to commit the changes, or roll back on failure
         
-        # Process each sheet
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+    Returns:
+        Counts of inserted, updated, deleted and unchanged P&L rows
+    """
+    stats = stats if stats is not None else IngestionStats()
+    with stats.memory():
+        try:
+            # Parse without writing anything yet
+            year = report_year(db, report_id)
+            parsed = BulkWriter(None)
+            with stats.stage("parse"):
+                read_workbook(file_path, report_id, year, parsed, progress, workers, stats)
+            
+            diff_start = time.perf_counter()
+            record_columns = PNL_COLUMNS + PNL_POSITION_COLUMNS
+            new = pd.DataFrame(parsed.batches.get(PnLData.__tablename__) or {col: [] for col in record_columns})
+            existing = pd.DataFrame(
+                db.query(PnLData.id, *(getattr(PnLData, column) for column in record_columns))
+                .filter(PnLData.report_id == report_id)
+                .all(),
+                columns=['id'] + record_columns
+            )
+            
+            inserts, updates, delete_ids = diff_pnl_records(new[record_columns], existing)
+            stats.add_stage("diff", time.perf_counter() - diff_start)
+            
+            write_start = time.perf_counter()
+            for start in range(0, len(delete_ids), 500):
+                db.query(PnLData).filter(
+                    PnLData.id.in_(delete_ids[start:start + 500])
+                ).delete(synchronize_session=False)
             
-            if sheet_name == "PnL Summary":
-                process_pnl_summary_sheet(df, report_id, db)
-            elif sheet_name == "RECONCILIATION":
-                process_reconciliation_sheet(df, report_id, db)
-            elif sheet_name == "Red flags":
-                process_red_flags_sheet(df, report_id, db)
-            elif sheet_name == "Analysis Per Entity":
-                process_entity_analysis_sheet(df, report_id, db)
-            # Add more sheet processing as needed
+            if updates:
+                db.bulk_update_mappings(PnLData, updates)
+            
+            writer = BulkWriter(db, batch_size=batch_size)
+            write_pnl_records(inserts, report_id, writer)
+            
+            for model in (PnLSeries, RedFlag, EntityAnalysis):
+                db.query(model).filter(model.report_id == report_id).delete(synchronize_session=False)
+                if parsed.pending(model.__tablename__):
+                    writer.add_columns(model, parsed.batches[model.__tablename__])
+            
+            writer.flush()
+            stats.add_stage("db_write", time.perf_counter() - write_start)
+            if commit:
+                with stats.stage("commit"):
+                    db.commit()
+            
+            stats.record_rows({table: values['rows'] for table, values in writer.stats().items()})
+            
+            summary = {
+                "inserted": len(inserts),
+                "updated": len(updates),
+                "deleted": len(delete_ids),
+                "unchanged": len(existing) - len(updates) - len(delete_ids)
+            }
+            logger.info(f"Re-ingested Excel file {file_path} into report {report_id}: {summary}")
+            return summary
+            
+        except Exception as e:
+            if commit:
+                db.rollback()
+            logger.error(f"Error re-ingesting Excel file: {str(e)}")
+            raise
+
+def report_year(db: Session, report_id: int) -> int:
+    """Year of the report's month, which the month columns of its sheets belong to."""
+    month, year = db.query(Report.month, Report.year).filter(Report.id == report_id).one()
+    return int(month[:4]) if month else year
+
+def diff_pnl_records(new: pd.DataFrame, existing: pd.DataFrame) -> Tuple[pd.DataFrame, List[dict], List[int]]:
+    """
+    Compare newly parsed P&L records with the stored rows of a report.
+    
+    Records are matched on the cell they come from: (sheet, sheet_row,
+    month). The same account can appear in both P&L sheets, and twice in
+    one, so the account name is not a key; a row whose account was renamed
+    is updated like one whose value changed. Rows stored before the
+    position columns existed match nothing and are replaced.
+    
+    Args:
+        new: Parsed records with the PNL_COLUMNS and PNL_POSITION_COLUMNS
+        existing: Stored rows with the same columns plus id
         
-        # Commit all changes
-        db.commit()
-        logger.info(f"Successfully processed Excel file: {file_path}")
+    Returns:
+        Records to insert, update mappings (id, account_name, category, actuals) and ids to delete
+    """
+    # Positions of rows stored without one come back as None
+    new = new.astype({'sheet_row': float})
+    existing = existing.astype({'sheet_row': float})
+    merged = new.merge(
+        existing, on=['sheet', 'sheet_row', 'month'], how='outer',
+        suffixes=('', '_old'), indicator=True
+    )
+    
+    inserts = merged[merged['_merge'] == 'left_only'][PNL_COLUMNS + PNL_POSITION_COLUMNS].astype({'sheet_row': int})
+    delete_ids = merged.loc[merged['_merge'] == 'right_only', 'id'].astype(int).tolist()
+    
+    both = merged[merged['_merge'] == 'both']
+    same_actuals = (both['actuals'] == both['actuals_old']) | (both['actuals'].isna() & both['actuals_old'].isna())
+    changed = both[
+        ~same_actuals | (both['category'] != both['category_old']) | (both['account_name'] != both['account_name_old'])
+    ]
+    updates = [
+        {"id": int(row_id), "account_name": account_name, "category": category, "actuals": actuals}
+        for row_id, account_name, category, actuals in zip(
+            changed['id'], changed['account_name'], changed['category'], changed['actuals'].tolist()
+        )
+    ]
+    
+    return inserts, updates, delete_ids
+
+def read_workbook(
+    file_path: str,
+    report_id: int,
+    year: int,
+    writer: BulkWriter,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    workers: int = 1,
+    stats: Optional[IngestionStats] = None
+):
+    """
+    Run the sheet processors over a workbook.
+    
+    The workbook is opened once in read-only streaming mode and each known
+    sheet is handed to its processor as a row iterator. With more than one
+    worker and CPU, workbooks whose sheets take at least
+    INGEST_PARALLEL_MIN_SIZE uncompressed have them parsed in a process
+    pool instead, and their columnar batches are handed to the writer in
+    sheet order.
+    
+    Args:
+        file_path: Path to the Excel file
+        report_id: ID of the report to associate the data with
+        year: Year of the sheets' month columns
+        writer: Writer that receives the parsed records
+        progress: Called as progress(sheet_name, done, total) after each sheet
+        workers: Number of processes parsing sheets in parallel
+        stats: Receives the parse time, rows and rejected cells of each sheet
+    """
+    if is_tabular_source(file_path):
+        read_tabular_source(file_path, report_id, year, writer, progress, stats)
+        return
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    
+    try:
+        # Sheets without a processor are skipped without being read
+        sheet_names = [name for name in workbook.sheetnames if name in SHEET_PROCESSORS]
+        workers = min(workers, len(sheet_names), available_cpus())
+        parallel = (
+            workers > 1
+            and sheet_data_size(file_path) >= INGEST_PARALLEL_MIN_SIZE
+            and can_use_process_pool()
+        )
         
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error processing Excel file: {str(e)}")
-        raise
+        if not parallel:
+            for done, sheet_name in enumerate(sheet_names, start=1):
+                rows = workbook[sheet_name].iter_rows(values_only=True)
+                run_sheet_processor(sheet_name, rows, report_id, year, writer, stats)
+                
+                if progress:
+                    progress(sheet_name, done, len(sheet_names))
+    finally:
+        workbook.close()
+    
+    if parallel:
+        read_sheets_in_parallel(file_path, sheet_names, report_id, year, writer, progress, workers, stats)
 
-def process_pnl_summary_sheet(df: pd.DataFrame, report_id: int, db: Session):
-    """Process the P&L Summary sheet."""
+def run_sheet_processor(
+    sheet_name: str,
+    rows: Union[pd.DataFrame, Iterable[tuple]],
+    report_id: int,
+    year: int,
+    writer: BulkWriter,
+    stats: Optional[IngestionStats] = None
+):
+    """Run the processor of a sheet, timing it when stats are collected."""
+    if stats is None:
+        SHEET_PROCESSORS[sheet_name](rows, report_id, year, writer)
+        return
+    
+    with stats.sheet(sheet_name, writer):
+        SHEET_PROCESSORS[sheet_name](rows, report_id, year, writer)
+
+def read_tabular_source(
+    file_path: str,
+    report_id: int,
+    year: int,
+    writer: BulkWriter,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    stats: Optional[IngestionStats] = None
+):
+    """
+    Run the sheet processors over a CSV/Parquet export of the workbook.
+    
+    Each file is read into a DataFrame holding only the columns its
+    processor uses, as far as they can be told from the file's header, and
+    handed to that processor. These formats parse fast
+    enough that the sheets are always read in the calling process.
+    
+    Args:
+        file_path: Path to the CSV, Parquet or zip file
+        report_id: ID of the report to associate the data with
+        year: Year of the sheets' month columns
+        writer: Writer that receives the parsed records
+        progress: Called as progress(sheet_name, done, total) after each sheet
+        stats: Receives the parse time, rows and rejected cells of each sheet
+    """
+    sheets = tabular_sheets(file_path, list(SHEET_PROCESSORS))
+    
+    for done, (sheet_name, member) in enumerate(sheets, start=1):
+        if stats is None:
+            df = read_tabular_sheet(file_path, member, lambda names: columns_in_use(sheet_name, names))
+            SHEET_PROCESSORS[sheet_name](df, report_id, year, writer)
+        else:
+            with stats.sheet(sheet_name, writer):
+                df = read_tabular_sheet(file_path, member, lambda names: columns_in_use(sheet_name, names))
+                SHEET_PROCESSORS[sheet_name](df, report_id, year, writer)
+        
+        if progress:
+            progress(sheet_name, done, len(sheets))
+
+def columns_in_use(sheet_name: str, header: List[str]) -> Optional[List[int]]:
+    """
+    Positions of the columns a sheet's processor reads, judged from the
+    first row of a CSV/Parquet file.
+    
+    Returns None, meaning all columns are needed, when the header row of
+    the sheet is not the first row and the layout cannot be told yet. The
+    header is only probed: nothing is logged or cached, since detect_layout
+    sees the full header block when the sheet is parsed.
+    """
+    if sheet_name == "Analysis Per Entity":
+        return list(ENTITY_COLUMNS)
+    
+    layout = find_layout(sheet_name, [tuple(header)])
+    return layout.positions() if layout is not None else None
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def sheet_data_size(file_path: str) -> int:
+    """
+    Uncompressed size in bytes of the sheets and shared strings of a workbook.
+    
+    Read from the zip directory, so nothing is parsed. Used rather than row
+    counts, which not every writer declares (openpyxl's write-only mode
+    does not).
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        return sum(
+            member.file_size for member in archive.infolist()
+            if (member.filename.startswith("xl/worksheets/") and member.filename.endswith(".xml"))
+            or member.filename == "xl/sharedStrings.xml"
+        )
+
+def can_use_process_pool() -> bool:
+    """Daemonic processes (e.g. Celery prefork children) cannot start a process pool."""
+    if multiprocessing.current_process().daemon:
+        logger.warning("Running in a daemonic process, parsing sheets sequentially")
+        return False
+    return True
+
+def read_sheets_in_parallel(
+    file_path: str,
+    sheet_names: List[str],
+    report_id: int,
+    year: int,
+    writer: BulkWriter,
+    progress: Optional[Callable[[str, int, int], None]],
+    workers: int,
+    stats: Optional[IngestionStats] = None
+):
+    """Parse sheets in the process pool and buffer their records in the writer."""
+    executor = get_executor(workers)
+    futures = [executor.submit(parse_sheet, file_path, sheet_name, report_id, year) for sheet_name in sheet_names]
+    
+    # Merge in sheet order so the records come out as in a sequential run
+    for done, (sheet_name, future) in enumerate(zip(sheet_names, futures), start=1):
+        batches, sheet_stats = future.result()
+        for table, columns in batches.items():
+            if columns:
+                writer.add_columns(INGEST_MODELS[table], columns)
+        
+        if stats is not None:
+            sheet = sheet_stats["sheets"][sheet_name]
+            stats.add_sheet(sheet_name, sheet["seconds"], sheet["rows"], sheet["rejected_cells"])
+            for stage, seconds in sheet_stats["stages"].items():
+                stats.add_stage(stage, seconds)
+        
+        if progress:
+            progress(sheet_name, done, len(sheet_names))
+
+def parse_sheet(file_path: str, sheet_name: str, report_id: int, year: int) -> Tuple[Dict[str, Dict[str, list]], Dict]:
+    """
+    Parse a single sheet without touching the database.
+    
+    Runs in a worker process: the sheet's processor writes into a
+    collect-only BulkWriter and the plain columnar batches are returned,
+    along with the sheet's timings and counts.
+    
+    Args:
+        file_path: Path to the Excel file
+        sheet_name: Name of the sheet to parse
+        report_id: ID of the report to associate the data with
+        year: Year of the sheet's month columns
+        
+    Returns:
+        Table name -> column name -> values, and the IngestionStats as a dict
+    """
+    collector = BulkWriter(None)
+    stats = IngestionStats()
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    
     try:
-        # Skip the first few rows which contain headers
-        df = df.iloc[3:].reset_index(drop=True)
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        run_sheet_processor(sheet_name, rows, report_id, year, collector, stats)
+    finally:
+        workbook.close()
+    
+    return collector.batches, stats.to_dict()
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared sheet-parsing pool, created on first use."""
+    global _executor, _executor_workers
+    
+    # Reports of a batch upload are ingested from several threads at once
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=True)
+            # spawn: never fork a process holding database connections or threads
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
         
-        # Rename columns for easier processing
-        df.columns = [
-            'account_name', 'jan', 'feb', 'mar', 'apr', 'may', 'jun',
-            'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'total'
-        ]
+        return _executor
+
+def layout_frame(rows: Union[pd.DataFrame, Iterable[tuple]], sheet_name: str) -> Tuple[pd.DataFrame, SheetLayout]:
+    """
+    Cut the data of a sheet out along its detected layout.
+    
+    The top of the sheet is handed to the layout detector, which finds the
+    header row and the position of each column (or returns the cached
+    layout of a known template). The rows below the header are returned
+    with one column per field and per month, named after them. Row tuples
+    are consumed one at a time, each cut down to those columns, so the
+    whole sheet is never held at its full width.
+    
+    Args:
+        rows: Row tuples as yielded by openpyxl's iter_rows(values_only=True),
+            or a DataFrame whose column names are the first row of the sheet
+        sheet_name: Name of the sheet, which selects the fields to look for
         
-        # Process each row
-        for _, row in df.iterrows():
-            account_name = row['account_name']
-            
-            # Skip empty rows or headers
-            if pd.isna(account_name) or account_name in ['Account Name', '']:
-                continue
-            
-            # Determine category based on account name
-            category = determine_category(account_name)
-            
-            # Process monthly data
-            for month in ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']:
-                value = row[month]
-                
-                if pd.notna(value) and value != 0:
-                    # Convert to numeric if it's a string
-                    if isinstance(value, str):
-                        value = value.replace(',', '').replace('$', '').replace('(', '-').replace(')', '')
-                        try:
-                            value = float(value)
-                        except ValueError:
-                            continue
-                    
-                    # Create PnLData record
-                    pnl_data = PnLData(
-                        report_id=report_id,
-                        account_name=account_name,
-                        category=category,
-                        month=f"2025-{month_to_number(month)}",
-                        actuals=value
-                    )
-                    db.add(pnl_data)
+    Returns:
+        DataFrame of the data rows, and the layout it was cut along
+    """
+    if isinstance(rows, pd.DataFrame):
+        head = [tuple(rows.columns)] + list(rows.iloc[:HEADER_SCAN_ROWS - 1].itertuples(index=False, name=None))
+    else:
+        rows = iter(rows)
+        head = [tuple(row) for row in islice(rows, HEADER_SCAN_ROWS)]
+    layout = detect_layout(sheet_name, head)
+    
+    names = list(layout.columns) + [month for month, _ in layout.months]
+    positions = list(layout.columns.values()) + [position for _, position in layout.months]
+    
+    if isinstance(rows, pd.DataFrame):
+        # Row i of the frame is row i + 1 of the sheet
+        width = rows.shape[1]
+        df = rows.iloc[layout.header_row:, positions]
+        df.columns = names
+    else:
+        width = max((len(row) for row in head), default=0)
+        
+        def cut(data_rows):
+            nonlocal width
+            for row in data_rows:
+                # Read-only worksheets can yield ragged rows; missing cells are empty
+                width = max(width, len(row))
+                yield tuple(row[position] if position < len(row) else None for position in positions)
+        
+        df = pd.DataFrame(list(cut(chain(head[layout.header_row + 1:], rows))), columns=names)
+    
+    if max(positions) >= width:
+        raise ValueError(f"Sheet '{sheet_name}' has {width} columns, its layout needs {max(positions) + 1}")
+    
+    return df.reset_index(drop=True), layout
+
+PNL_COLUMNS = ['account_name', 'category', 'month', 'actuals']
+
+# Where each P&L record comes from: the sheet, and the position of its row
+# among the data rows below the sheet's header
+PNL_POSITION_COLUMNS = ['sheet', 'sheet_row']
+
+def parse_pnl_summary_sheet(rows: Iterable[tuple], year: int) -> pd.DataFrame:
+    """Parse the P&L Summary sheet into long-format PnLData records."""
+    df, layout = layout_frame(rows, "PnL Summary")
+    
+    records = melt_monthly_values(df, [month for month, _ in layout.months], year)
+    return records.assign(sheet="PnL Summary")[PNL_COLUMNS + PNL_POSITION_COLUMNS]
+
+def parse_reconciliation_sheet(rows: Iterable[tuple], year: int) -> pd.DataFrame:
+    """Parse the "Actual HL" rows of the RECONCILIATION sheet into long-format PnLData records."""
+    df, layout = layout_frame(rows, "RECONCILIATION")
+    
+    # Only process "Actual HL" rows
+    df = df[df['type'] == 'Actual HL']
+    
+    records = melt_monthly_values(df, [month for month, _ in layout.months], year)
+    return records.assign(sheet="RECONCILIATION")[PNL_COLUMNS + PNL_POSITION_COLUMNS]
+
+def melt_monthly_values(df: pd.DataFrame, months: list, year: int) -> pd.DataFrame:
+    """
+    Melt the month columns of a sheet into one record per account and month.
+    
+    Accounting strings such as "(1,234)" or "$5,000" are coerced to floats
+    column-wide. Numeric cells that are empty or zero are dropped, as are
+    strings that cannot be parsed. Records keep the sheet's row order and,
+    within a row, the month order.
+    
+    Args:
+        df: Sheet data with an 'account_name' column and one column per
+            month, indexed by the position of each row in the sheet
+        months: Month abbreviations of the columns to melt
+        year: Year the months belong to, that of the report
+        
+    Returns:
+        DataFrame with account_name, category, month, actuals and sheet_row columns
+    """
+    # Skip empty rows or headers
+    accounts = df['account_name']
+    df = df[accounts.notna() & ~accounts.isin(['Account Name', ''])]
+    
+    long = df.melt(
+        id_vars=['account_name'], value_vars=months,
+        var_name='month', value_name='value', ignore_index=False
+    )
+    # melt stacks column by column; restore row-major order
+    long = long.sort_index(kind='stable').rename_axis('sheet_row').reset_index()
+    
+    values = long['value']
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'mixed', 'mixed-integer'):
+        # Non-string cells come back as NaN from the .str accessor
+        cleaned = (
+            values.str.replace(',', '', regex=False)
+            .str.replace('$', '', regex=False)
+            .str.replace('(', '-', regex=False)
+            .str.replace(')', '', regex=False)
+        )
+        is_text = cleaned.notna()
+        text_values = pd.to_numeric(cleaned, errors='coerce')
+        numeric_values = pd.to_numeric(values.where(~is_text), errors='coerce')
+        record_rejected((is_text & text_values.isna() & (cleaned.str.strip() != '')).sum())
+    else:
+        is_text = pd.Series(False, index=values.index)
+        text_values = pd.Series(np.nan, index=values.index)
+        numeric_values = values.astype(float)
+    
+    # Parsed strings are kept even when zero; numeric cells only when non-zero
+    keep = (is_text & text_values.notna()) | (~is_text & numeric_values.notna() & (numeric_values != 0))
+    long['actuals'] = text_values.where(is_text, numeric_values)
+    long = long[keep]
+    
+    # Determine each distinct account's category once
+    with timed("categorize"):
+        categories = {name: determine_category(name) for name in long['account_name'].unique()}
+        long = long.assign(
+            category=long['account_name'].map(categories),
+            month=long['month'].map({month: f"{year}-{month_to_number(month)}" for month in months})
+        )
+    
+    return long[PNL_COLUMNS + ['sheet_row']].reset_index(drop=True)
+
+def write_pnl_records(records: pd.DataFrame, report_id: int, writer: BulkWriter):
+    """Buffer long-format PnLData records for a report."""
+    columns = {column: records[column].tolist() for column in PNL_COLUMNS + PNL_POSITION_COLUMNS}
+    columns['report_id'] = [report_id] * len(records)
+    writer.add_columns(PnLData, columns)
+
+def write_pnl_series(records: pd.DataFrame, report_id: int, writer: BulkWriter):
+    """Buffer the long-format records of a sheet packed into PnLSeries rows, one per account row."""
+    columns = pack_pnl_series(records)
+    columns['report_id'] = [report_id] * len(columns['year'])
+    writer.add_columns(PnLSeries, columns)
+
+def process_pnl_summary_sheet(rows: Iterable[tuple], report_id: int, year: int, writer: BulkWriter):
+    """Process the P&L Summary sheet."""
+    try:
+        records = parse_pnl_summary_sheet(rows, year)
+        write_pnl_records(records, report_id, writer)
+        write_pnl_series(records, report_id, writer)
         
         logger.info(f"Processed P&L Summary sheet for report {report_id}")
         
@@ -95,56 +632,12 @@ def process_pnl_summary_sheet(df: pd.DataFrame, report_id: int, db: Session):
         logger.error(f"Error processing P&L Summary sheet: {str(e)}")
         raise
 
-def process_reconciliation_sheet(df: pd.DataFrame, report_id: int, db: Session):
+def process_reconciliation_sheet(rows: Iterable[tuple], report_id: int, year: int, writer: BulkWriter):
     """Process the RECONCILIATION sheet."""
     try:
-        # Skip the first row which contains headers
-        df = df.iloc[1:].reset_index(drop=True)
-        
-        # Rename columns for easier processing
-        df.columns = [
-            'id', 'account_name', 'type', 'jan', 'feb', 'mar', 'apr', 'may', 'jun',
-            'jul', 'aug', 'ytd'
-        ]
-        
-        # Process each row
-        for _, row in df.iterrows():
-            account_name = row['account_name']
-            type_val = row['type']
-            
-            # Skip empty rows or headers
-            if pd.isna(account_name) or account_name in ['Account Name', '']:
-                continue
-            
-            # Only process "Actual HL" rows
-            if type_val != 'Actual HL':
-                continue
-            
-            # Determine category based on account name
-            category = determine_category(account_name)
-            
-            # Process monthly data
-            for month in ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug']:
-                value = row[month]
-                
-                if pd.notna(value) and value != 0:
-                    # Convert to numeric if it's a string
-                    if isinstance(value, str):
-                        value = value.replace(',', '').replace('$', '').replace('(', '-').replace(')', '')
-                        try:
-                            value = float(value)
-                        except ValueError:
-                            continue
-                    
-                    # Create PnLData record
-                    pnl_data = PnLData(
-                        report_id=report_id,
-                        account_name=account_name,
-                        category=category,
-                        month=f"2025-{month_to_number(month)}",
-                        actuals=value
-                    )
-                    db.add(pnl_data)
+        records = parse_reconciliation_sheet(rows, year)
+        write_pnl_records(records, report_id, writer)
+        write_pnl_series(records, report_id, writer)
         
         logger.info(f"Processed RECONCILIATION sheet for report {report_id}")
         
@@ -152,16 +645,10 @@ def process_reconciliation_sheet(df: pd.DataFrame, report_id: int, db: Session):
         logger.error(f"Error processing RECONCILIATION sheet: {str(e)}")
         raise
 
-def process_red_flags_sheet(df: pd.DataFrame, report_id: int, db: Session):
+def process_red_flags_sheet(rows: Iterable[tuple], report_id: int, year: int, writer: BulkWriter):
     """Process the Red flags sheet."""
     try:
-        # Skip the first few rows which contain headers
-        df = df.iloc[1:].reset_index(drop=True)
-        
-        # Rename columns for easier processing
-        df.columns = [
-            'no', 'account_name', 'total_revenue', 'total_cost', 'gross_profit', 'gpm', 'comment'
-        ]
+        df, _ = layout_frame(rows, "Red flags")
         
         # Process each row
         for _, row in df.iterrows():
@@ -181,20 +668,21 @@ def process_red_flags_sheet(df: pd.DataFrame, report_id: int, db: Session):
                 try:
                     gpm = float(gpm)
                 except ValueError:
+                    record_rejected(1)
                     gpm = 0
             
             # Extract comment
             comment = row['comment']
             
-            # Create RedFlag record
-            red_flag = RedFlag(
+            # Buffer RedFlag record
+            writer.add(
+                RedFlag,
                 report_id=report_id,
                 project_name=project_name,
                 country=country,
                 gpm=gpm,
                 comment=comment
             )
-            db.add(red_flag)
         
         logger.info(f"Processed Red flags sheet for report {report_id}")
         
@@ -202,78 +690,103 @@ def process_red_flags_sheet(df: pd.DataFrame, report_id: int, db: Session):
         logger.error(f"Error processing Red flags sheet: {str(e)}")
         raise
 
-def process_entity_analysis_sheet(df: pd.DataFrame, report_id: int, db: Session):
-    """Process the Analysis Per Entity sheet."""
-    try:
-        # Find the start of the entity data
-        entity_start = None
-        for i, row in df.iterrows():
-            if pd.notna(row.iloc[0]) and isinstance(row.iloc[0], str) and 'Revenue' in row.iloc[0]:
-                entity_start = i
-                break
+# First-column labels of the metric rows inside an entity block
+ENTITY_REVENUE_LABEL = 'revenue'
+ENTITY_COST_LABEL = 'cost of sales'
+ENTITY_METRIC_LABELS = {ENTITY_REVENUE_LABEL, ENTITY_COST_LABEL, 'gross profit', 'gpm', 'gross profit margin'}
+
+# Label, local, interco and total columns of the entity blocks
+ENTITY_COLUMNS = range(0, 4)
+
+def sheet_rows(rows: Union[pd.DataFrame, Iterable[tuple]]) -> Iterable[tuple]:
+    """Yield the data rows of a sheet below its header row, one tuple at a time."""
+    if isinstance(rows, pd.DataFrame):
+        yield from rows.itertuples(index=False, name=None)
+        return
+    
+    rows = iter(rows)
+    next(rows, None)
+    yield from rows
+
+def parse_entity_analysis_sheet(rows: Iterable[tuple]) -> List[dict]:
+    """
+    Parse the Analysis Per Entity sheet in a single pass.
+    
+    The sheet is a sequence of entity blocks: a row holding the entity
+    name, followed by metric rows ('Revenue', 'Cost of Sales', ...) whose
+    next three columns are the local, interco and total amounts. Rows are
+    walked once; a new entity name closes the current block, and a block
+    is emitted only if it contains at least one metric row.
+    
+    Args:
+        rows: Row tuples of the sheet, header row first
         
-        if entity_start is None:
-            logger.warning("Could not find entity data in Analysis Per Entity sheet")
+    Returns:
+        One dict of EntityAnalysis values per entity block
+    """
+    def amounts(row):
+        values = list(row[1:4]) + [None] * (4 - len(row))
+        return [value if pd.notna(value) else 0 for value in values[:3]]
+    
+    def close(block):
+        if block is None or not block['has_metrics']:
             return
+        local_revenue, interco_revenue, total_revenue = block['revenue']
+        local_cost, interco_cost, total_cost = block['cost']
         
-        # Extract entity data
-        entity_data = df.iloc[entity_start:].reset_index(drop=True)
+        # Calculate gross profit and GPM
+        gross_profit = total_revenue - total_cost
+        gpm = (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
         
-        # Find all entities
-        entities = []
-        current_entity = None
+        entities.append({
+            'entity_name': block['name'],
+            'local_revenue': local_revenue,
+            'interco_revenue': interco_revenue,
+            'total_revenue': total_revenue,
+            'local_cost': local_cost,
+            'interco_cost': interco_cost,
+            'total_cost': total_cost,
+            'gross_profit': gross_profit,
+            'gpm': gpm
+        })
+    
+    entities = []
+    block = None
+    
+    for row in sheet_rows(rows):
+        if not row or not isinstance(row[0], str) or not row[0].strip():
+            continue
         
-        for i, row in entity_data.iterrows():
-            if pd.notna(row.iloc[0]) and isinstance(row.iloc[0], str) and not row.iloc[0].startswith('Revenue'):
-                current_entity = row.iloc[0]
-                entities.append(current_entity)
+        label = row[0].strip().lower()
+        if label.startswith(ENTITY_REVENUE_LABEL):
+            if block is not None:
+                block['revenue'] = amounts(row)
+                block['has_metrics'] = True
+        elif label in ENTITY_METRIC_LABELS:
+            if block is not None:
+                if label == ENTITY_COST_LABEL:
+                    block['cost'] = amounts(row)
+                block['has_metrics'] = True
+        else:
+            # Any other label starts the next entity's block
+            close(block)
+            block = {'name': row[0], 'revenue': [0, 0, 0], 'cost': [0, 0, 0], 'has_metrics': False}
+    
+    close(block)
+    return entities
+
+def process_entity_analysis_sheet(rows: Iterable[tuple], report_id: int, year: int, writer: BulkWriter):
+    """Process the Analysis Per Entity sheet."""
+    try:
+        entities = parse_entity_analysis_sheet(rows)
+        
+        if not entities:
+            logger.warning("Could not find entity data in Analysis Per Entity sheet")
+            return
         
-        # Process each entity
         for entity in entities:
-            # Find the rows for this entity
-            entity_rows = entity_data[entity_data.iloc[0] == entity]
-            
-            if len(entity_rows) == 0:
-                continue
-            
-            # Extract revenue data
-            revenue_row = entity_data[entity_data.iloc[0] == 'Revenue']
-            if len(revenue_row) > 0:
-                revenue_data = revenue_row.iloc[0].iloc[1:].tolist()
-                local_revenue = revenue_data[0] if len(revenue_data) > 0 and pd.notna(revenue_data[0]) else 0
-                interco_revenue = revenue_data[1] if len(revenue_data) > 1 and pd.notna(revenue_data[1]) else 0
-                total_revenue = revenue_data[2] if len(revenue_data) > 2 and pd.notna(revenue_data[2]) else 0
-            else:
-                local_revenue = interco_revenue = total_revenue = 0
-            
-            # Extract cost data
-            cost_row = entity_data[entity_data.iloc[0] == 'Cost of Sales']
-            if len(cost_row) > 0:
-                cost_data = cost_row.iloc[0].iloc[1:].tolist()
-                local_cost = cost_data[0] if len(cost_data) > 0 and pd.notna(cost_data[0]) else 0
-                interco_cost = cost_data[1] if len(cost_data) > 1 and pd.notna(cost_data[1]) else 0
-                total_cost = cost_data[2] if len(cost_data) > 2 and pd.notna(cost_data[2]) else 0
-            else:
-                local_cost = interco_cost = total_cost = 0
-            
-            # Calculate gross profit and GPM
-            gross_profit = total_revenue - total_cost
-            gpm = (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
-            
-            # Create EntityAnalysis record
-            entity_analysis = EntityAnalysis(
-                report_id=report_id,
-                entity_name=entity,
-                local_revenue=local_revenue,
-                interco_revenue=interco_revenue,
-                total_revenue=total_revenue,
-                local_cost=local_cost,
-                interco_cost=interco_cost,
-                total_cost=total_cost,
-                gross_profit=gross_profit,
-                gpm=gpm
-            )
-            db.add(entity_analysis)
+            # Buffer EntityAnalysis record
+            writer.add(EntityAnalysis, report_id=report_id, **entity)
         
         logger.info(f"Processed Analysis Per Entity sheet for report {report_id}")
         
@@ -281,6 +794,14 @@ def process_entity_analysis_sheet(df: pd.DataFrame, report_id: int, db: Session)
         logger.error(f"Error processing Analysis Per Entity sheet: {str(e)}")
         raise
 
+# Sheet name -> processor; sheets not listed here are never parsed
+SHEET_PROCESSORS = {
+    "PnL Summary": process_pnl_summary_sheet,
+    "RECONCILIATION": process_reconciliation_sheet,
+    "Red flags": process_red_flags_sheet,
+    "Analysis Per Entity": process_entity_analysis_sheet,
+}
+
 def determine_category(account_name: str) -> str:
     """Determine the category of an account based on its name."""
     account_name_lower = account_name.lower()
@@ -1,47 +1,217 @@
 import os
-import shutil
+import re
+import hashlib
+import tempfile
+import time
+import uuid
+import zipfile
 from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
 import logging
 
+from fastapi.concurrency import run_in_threadpool
+
+from .telemetry import IngestionStats
+
 logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = "uploads"
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE_MB", "200")) * 1024 * 1024
+# Total size of the files of a batch upload, once its zips are unpacked
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE_MB", "1000")) * 1024 * 1024
+
+class UploadTooLargeError(Exception):
+    """Raised when an uploaded file exceeds the maximum upload size."""
+
+def _write_chunk(buffer, hasher, chunk: bytes):
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+def _finalize_file(buffer, temp_path: str, file_path: str):
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+    os.replace(temp_path, file_path)
+
+def _discard_file(buffer, temp_path: str):
+    buffer.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+# Prefix _unique_path puts before the name of a saved file
+SAVED_NAME_PREFIX = re.compile(r"^\d{8}_\d{6}_[0-9a-f]{8}_")
 
-async def save_upload_file(upload_file, user_id: int) -> str:
+def original_filename(file_path: str) -> str:
+    """The name a saved file was uploaded under, without the prefix that made it unique."""
+    return SAVED_NAME_PREFIX.sub("", os.path.basename(file_path))
+
+def _unique_path(user_dir: str, name: str) -> str:
+    # The timestamp alone collides when the same file is uploaded twice within a second
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(user_dir, f"{timestamp}_{uuid.uuid4().hex[:8]}_{os.path.basename(name)}")
+
+async def save_upload_file(
+    upload_file,
+    user_id: int,
+    max_size: int = MAX_UPLOAD_SIZE,
+    stats: Optional[IngestionStats] = None
+) -> Tuple[str, str]:
     """
     Save an uploaded file to the upload directory.
     
+    The file is streamed to disk in chunks with all blocking I/O in the
+    threadpool, hashed while it is written and only moved to its final
+    name once complete, so a partial upload is never visible.
+    
     Args:
         upload_file: The uploaded file
         user_id: ID of the user uploading the file
+        max_size: Maximum size in bytes; larger uploads are rejected
+        stats: Receives the time spent saving and the size of the file
         
     Returns:
-        Path to the saved file
+        Path to the saved file and the SHA-256 hex digest of its content
+        
+    Raises:
+        UploadTooLargeError: If the file is larger than max_size
     """
     try:
-        # Create upload directory if it doesn't exist
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        start = time.perf_counter()
         
         # Create user-specific directory
         user_dir = os.path.join(UPLOAD_DIR, str(user_id))
-        os.makedirs(user_dir, exist_ok=True)
+        await run_in_threadpool(os.makedirs, user_dir, exist_ok=True)
         
         # Generate a unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{upload_file.filename}"
-        file_path = os.path.join(user_dir, filename)
+        file_path = _unique_path(user_dir, upload_file.filename)
+        
+        # Write to a temporary file next to the target so the rename is atomic
+        fd, temp_path = await run_in_threadpool(tempfile.mkstemp, dir=user_dir, prefix=".upload-", suffix=".part")
+        buffer = os.fdopen(fd, "wb")
+        hasher = hashlib.sha256()
+        size = 0
         
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        try:
+            while True:
+                chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_size / (1024 * 1024):g} MB")
+                
+                await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+            
+            await run_in_threadpool(_finalize_file, buffer, temp_path, file_path)
+        except BaseException:
+            await run_in_threadpool(_discard_file, buffer, temp_path)
+            raise
         
-        logger.info(f"File saved to {file_path}")
-        return file_path
+        digest = hasher.hexdigest()
+        if stats is not None:
+            stats.record_upload(size, time.perf_counter() - start)
+        logger.info(f"File saved to {file_path} ({size} bytes, sha256 {digest})")
+        return file_path, digest
         
     except Exception as e:
         logger.error(f"Error saving file: {str(e)}")
         raise
 
+def extract_archive(
+    archive_path: str,
+    user_id: int,
+    extensions: Sequence[str],
+    max_size: int = MAX_UPLOAD_SIZE,
+    max_total_size: int = MAX_BATCH_SIZE
+) -> List[Tuple[str, str, str, int]]:
+    """
+    Extract the files of an uploaded zip into the upload directory.
+    
+    Only members with one of the given extensions are extracted; each one
+    is streamed and hashed like a direct upload. The sizes the zip declares
+    are checked against the limits before anything is extracted, and the
+    bytes actually read are counted against them while extracting.
+    Blocking; call it from the threadpool in request handlers.
+    
+    Args:
+        archive_path: Path to the saved zip file
+        user_id: ID of the user uploading the file
+        extensions: Lower-case extensions of the members to extract
+        max_size: Maximum uncompressed size in bytes of each member
+        max_total_size: Maximum uncompressed size in bytes of all the members
+        
+    Returns:
+        (member file name, saved path, SHA-256 hex digest, size) for each member
+        
+    Raises:
+        UploadTooLargeError: If a member is larger than max_size, or all of
+            them together larger than max_total_size
+    """
+    user_dir = os.path.join(UPLOAD_DIR, str(user_id))
+    os.makedirs(user_dir, exist_ok=True)
+    extracted = []
+    total = 0
+    
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                member for member in archive.infolist()
+                if not member.is_dir()
+                and not os.path.basename(member.filename).startswith(".")
+                and os.path.basename(member.filename).lower().endswith(tuple(extensions))
+            ]
+            
+            for member in members:
+                if member.file_size > max_size:
+                    raise UploadTooLargeError(
+                        f"{os.path.basename(member.filename)} exceeds the maximum upload size of {max_size / (1024 * 1024):g} MB"
+                    )
+            if sum(member.file_size for member in members) > max_total_size:
+                raise UploadTooLargeError("The files in the zip exceed the maximum batch size")
+            
+            for member in members:
+                name = os.path.basename(member.filename)
+                file_path = _unique_path(user_dir, name)
+                fd, temp_path = tempfile.mkstemp(dir=user_dir, prefix=".upload-", suffix=".part")
+                buffer = os.fdopen(fd, "wb")
+                hasher = hashlib.sha256()
+                size = 0
+                
+                try:
+                    # The sizes in the zip directory can lie, so count while reading
+                    with archive.open(member) as source:
+                        while True:
+                            chunk = source.read(UPLOAD_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            
+                            size += len(chunk)
+                            if size > max_size:
+                                raise UploadTooLargeError(
+                                    f"{name} exceeds the maximum upload size of {max_size / (1024 * 1024):g} MB"
+                                )
+                            if total + size > max_total_size:
+                                raise UploadTooLargeError("The files in the zip exceed the maximum batch size")
+                            
+                            _write_chunk(buffer, hasher, chunk)
+                    
+                    _finalize_file(buffer, temp_path, file_path)
+                except BaseException:
+                    _discard_file(buffer, temp_path)
+                    raise
+                
+                total += size
+                extracted.append((name, file_path, hasher.hexdigest(), size))
+    except BaseException:
+        for _, file_path, _, _ in extracted:
+            delete_file(file_path)
+        raise
+    
+    logger.info(f"Extracted {len(extracted)} files from {archive_path}")
+    return extracted
+
 def delete_file(file_path: str) -> bool:
     """
     Delete a file from the filesystem.
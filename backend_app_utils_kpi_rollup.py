@@ -0,0 +1,202 @@
+import logging
+from typing import Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from ..models import User, Report, KPIRollup
+from .series import PeriodSeries, load_series, month_range, months_between, shift_month
+
+logger = logging.getLogger(__name__)
+
+# Amounts read from the P&L rows, and margins derived from them
+AMOUNT_METRICS = ("revenue", "direct_costs", "gross_profit", "opex", "net_profit")
+MARGIN_METRICS = ("gpm", "opm", "npm")
+ROLLUP_METRICS = AMOUNT_METRICS + MARGIN_METRICS
+
+def percent_change(values: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """
+    Percent change of amounts, NaN where the previous amount is missing or zero.
+
+    A missing current amount counts as zero, as the dashboard has always
+    compared them.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (np.nan_to_num(values) - previous) / previous * 100
+    return np.where(np.isnan(previous) | (previous == 0), np.nan, change)
+
+def compute_rollup(db: Session, owner_id: int, end: str, count: int) -> PeriodSeries:
+    """
+    Compute the KPI rollup of a user's processed reports for a range of months.
+
+    The amounts of the range and of the year before it are loaded in one
+    query; margins are taken on revenue, and changes against the previous
+    month and the same month a year before, as percent changes for amounts
+    and point differences for margins.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        end: Last month of the range, in "YYYY-MM" format
+        count: Number of months in the range, end included
+
+    Returns:
+        PeriodSeries of ROLLUP_METRICS over the range, with mom and yoy
+    """
+    series = load_series(db, owner_id, end, count + 12, AMOUNT_METRICS)
+    amounts = series.values
+    has_report = np.array([report_id is not None for report_id in series.report_ids])
+
+    revenue = amounts[:, AMOUNT_METRICS.index("revenue")]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        def margin(metric: str) -> np.ndarray:
+            profit = np.nan_to_num(amounts[:, AMOUNT_METRICS.index(metric)])
+            return np.where(revenue > 0, profit / revenue * 100, 0.0)
+
+        gpm = margin("gross_profit")
+        opm = margin("net_profit")
+    npm = opm  # Simplified, should be calculated after tax
+    margins = np.where(has_report[:, None], np.column_stack([gpm, opm, npm]), np.nan)
+
+    def changes(lag: int) -> np.ndarray:
+        previous_amounts = np.vstack([np.full((lag, amounts.shape[1]), np.nan), amounts[:-lag]])
+        previous_margins = np.vstack([np.full((lag, margins.shape[1]), np.nan), margins[:-lag]])
+        return np.column_stack([percent_change(amounts, previous_amounts), margins - previous_margins])
+
+    return PeriodSeries(
+        months=series.months[12:],
+        metrics=ROLLUP_METRICS,
+        values=np.column_stack([amounts, margins])[12:],
+        report_ids=series.report_ids[12:],
+        mom=changes(1)[12:],
+        yoy=changes(12)[12:]
+    )
+
+def rebuild_kpi_rollup(db: Session, owner_id: int, months: Iterable[str]):
+    """
+    Recompute the KPI rollup of some months of a user.
+
+    The user's row is locked first, so that reports of the same user
+    ingested at the same time rebuild their shared months one after the
+    other, each seeing the reports committed before it. Nothing is
+    committed here.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        months: Months to rebuild, in "YYYY-MM" format
+    """
+    months = sorted(set(months))
+    if not months:
+        return
+
+    db.query(User.id).filter(User.id == owner_id).with_for_update().first()
+
+    rollup = compute_rollup(db, owner_id, months[-1], months_between(months[0], months[-1]) + 1)
+
+    db.query(KPIRollup).filter(
+        KPIRollup.owner_id == owner_id,
+        KPIRollup.month.in_(months)
+    ).delete(synchronize_session=False)
+
+    rows = []
+    for month in months:
+        report_id = rollup.report_id(month)
+        if report_id is None:
+            continue
+        for metric in ROLLUP_METRICS:
+            rows.append({
+                "owner_id": owner_id,
+                "report_id": report_id,
+                "month": month,
+                "metric": metric,
+                "value": rollup.get(month, metric),
+                "mom": rollup.get_mom(month, metric),
+                "yoy": rollup.get_yoy(month, metric)
+            })
+    db.bulk_insert_mappings(KPIRollup, rows)
+
+def refresh_kpi_rollup(db: Session, owner_id: int, month: str):
+    """
+    Rebuild the KPI rollup after the report of a month changed.
+
+    The month's own figures change, and so do the month-over-month change
+    of the next month and the year-over-year change of the same month a
+    year later. Nothing is committed here, so the rollup is written in the
+    transaction that publishes the report.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        month: Month of the report, in "YYYY-MM" format
+    """
+    rebuild_kpi_rollup(db, owner_id, [month, shift_month(month, 1), shift_month(month, 12)])
+
+def load_kpi_series(db: Session, owner_id: int, end: str, count: int, metrics: Sequence[str]) -> PeriodSeries:
+    """
+    Read the KPI rollup of a user for a range of months.
+
+    The user's processed reports in the range are joined with their rollup
+    rows in one indexed query. If a report has no rollup rows yet (it was
+    processed before the rollup existed and has not been backfilled), the
+    range is computed from the P&L rows instead.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        end: Last month of the range, in "YYYY-MM" format
+        count: Number of months in the range, end included
+        metrics: Names of the metrics to read, from ROLLUP_METRICS
+
+    Returns:
+        PeriodSeries of the metrics over the range, with mom and yoy
+    """
+    months = month_range(end, count)
+    metrics = tuple(metrics)
+
+    rows = db.query(
+        Report.id, Report.month, KPIRollup.metric, KPIRollup.value, KPIRollup.mom, KPIRollup.yoy
+    ).outerjoin(KPIRollup, and_(
+        KPIRollup.owner_id == Report.owner_id,
+        KPIRollup.month == Report.month,
+        KPIRollup.report_id == Report.id,
+        KPIRollup.metric.in_(metrics)
+    )).filter(
+        Report.owner_id == owner_id,
+        Report.is_processed == True,
+        Report.month >= months[0],
+        Report.month <= months[-1]
+    ).all()
+
+    positions = {month: position for position, month in enumerate(months)}
+    arrays = {name: np.full((len(months), len(metrics)), np.nan) for name in ("value", "mom", "yoy")}
+    report_ids = [None] * len(months)
+    for report_id, month, metric, value, mom, yoy in rows:
+        position = positions.get(month)
+        if position is None:
+            continue
+        if metric is None:
+            logger.warning(f"No KPI rollup for report {report_id} ({month}), computing it from the P&L data")
+            rollup = compute_rollup(db, owner_id, end, count)
+            columns = [rollup.metrics.index(name) for name in metrics]
+            return rollup._replace(
+                metrics=metrics,
+                values=rollup.values[:, columns],
+                mom=rollup.mom[:, columns],
+                yoy=rollup.yoy[:, columns]
+            )
+        report_ids[position] = report_id
+        column = metrics.index(metric)
+        for name, figure in (("value", value), ("mom", mom), ("yoy", yoy)):
+            if figure is not None:
+                arrays[name][position, column] = figure
+
+    return PeriodSeries(
+        months=months,
+        metrics=metrics,
+        values=arrays["value"],
+        report_ids=report_ids,
+        mom=arrays["mom"],
+        yoy=arrays["yoy"]
+    )
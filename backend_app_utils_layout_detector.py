@@ -0,0 +1,243 @@
+import re
+import os
+import json
+import numbers
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rows scanned from the top of a sheet when looking for its header row
+HEADER_SCAN_ROWS = int(os.getenv("LAYOUT_HEADER_SCAN_ROWS", "20"))
+
+# Number of template fingerprints whose layout is kept in memory
+LAYOUT_CACHE_SIZE = int(os.getenv("LAYOUT_CACHE_SIZE", "256"))
+
+MONTH_NAMES = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+# "Jan", "January", "Jan-25", "Jan 2025", "Sept."
+MONTH_HEADER = re.compile(r"^([a-z]{3,9})\.?(?:[\s\-_'/]*\d{2,4})?$")
+
+ACCOUNT_HEADERS = ('account name', 'account', 'accounts', 'account description', 'description', 'line item')
+
+class SheetLayout(NamedTuple):
+    """Where the data of a sheet sits: its header row and the position of each field."""
+    header_row: int
+    columns: Dict[str, int]
+    months: List[Tuple[str, int]]
+    detected: bool = True
+
+    def positions(self) -> List[int]:
+        """Positions of all the columns in use, in sheet order."""
+        return sorted(set(self.columns.values()) | {position for _, position in self.months})
+
+# Header labels of the fields each sheet needs, and whether it has one
+# column per month
+LAYOUT_SPECS = {
+    "PnL Summary": {"fields": {"account_name": ACCOUNT_HEADERS}, "months": True},
+    "RECONCILIATION": {"fields": {"account_name": ACCOUNT_HEADERS, "type": ('type', 'row type')}, "months": True},
+    "Red flags": {
+        "fields": {
+            "account_name": ACCOUNT_HEADERS + ('project', 'project name'),
+            "gpm": ('gpm', 'gpm %', 'gpm%', 'gp %', 'gp%', 'gross profit margin', 'gross margin'),
+            "comment": ('comment', 'comments', 'remark', 'remarks')
+        },
+        "months": False
+    },
+}
+
+# Layouts of the reference template, used when no header row is found
+DEFAULT_LAYOUTS = {
+    "PnL Summary": SheetLayout(
+        header_row=3,
+        columns={"account_name": 0},
+        months=[(name[:3], position) for position, name in enumerate(MONTH_NAMES, start=1)],
+        detected=False
+    ),
+    "RECONCILIATION": SheetLayout(
+        header_row=1,
+        columns={"account_name": 1, "type": 2},
+        months=[(name[:3], position) for position, name in enumerate(MONTH_NAMES[:8], start=3)],
+        detected=False
+    ),
+    "Red flags": SheetLayout(
+        header_row=1,
+        columns={"account_name": 1, "gpm": 5, "comment": 6},
+        months=[],
+        detected=False
+    ),
+}
+
+_cache: "OrderedDict[Tuple[str, str], SheetLayout]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+def normalize_header(value) -> str:
+    """Lower-case a header cell and collapse its whitespace; non-text cells give an empty string."""
+    if not isinstance(value, str):
+        return ''
+    return ' '.join(value.strip().lower().rstrip(':').split())
+
+def month_of(value) -> Optional[str]:
+    """Month abbreviation ('jan' ... 'dec') named by a header cell, if any."""
+    if isinstance(value, (datetime, date)):
+        return MONTH_NAMES[value.month - 1][:3]
+
+    match = MONTH_HEADER.match(normalize_header(value))
+    if not match:
+        return None
+
+    word = match.group(1)
+    for name in MONTH_NAMES:
+        if name.startswith(word) or (word == 'sept' and name == 'september'):
+            return name[:3]
+    return None
+
+def is_number(value) -> bool:
+    # NaN is how empty cells come out of a DataFrame
+    return isinstance(value, numbers.Number) and not isinstance(value, bool) and value == value
+
+def header_block(rows: Sequence[tuple]) -> List[tuple]:
+    """
+    Leading rows of a sheet that hold no numbers.
+
+    This is the title and header part of the sheet, which stays the same
+    from one upload of a template to the next while the figures change.
+    """
+    block = []
+    for row in rows[:HEADER_SCAN_ROWS]:
+        if any(is_number(value) for value in row):
+            break
+        block.append(row)
+    return block
+
+def fingerprint(sheet_name: str, rows: Sequence[tuple]) -> str:
+    """Hash of a sheet's header block and width, identifying its template."""
+    # Text is kept as is; other cells only count by type (dates, empty, ...)
+    block = [
+        [normalize_header(value) or ('' if value is None or value != value else type(value).__name__) for value in row]
+        for row in header_block(rows)
+    ]
+    width = max((len(row) for row in rows[:HEADER_SCAN_ROWS]), default=0)
+    payload = json.dumps([sheet_name, width, block])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def match_header_row(row: tuple, spec: dict) -> Optional[Tuple[Dict[str, int], List[Tuple[str, int]]]]:
+    """Map the fields of a sheet onto a candidate header row, or None if the row is not its header."""
+    labels = [normalize_header(value) for value in row]
+
+    months = []
+    if spec["months"]:
+        seen = set()
+        for position, value in enumerate(row):
+            month = month_of(value)
+            if month and month not in seen:
+                seen.add(month)
+                months.append((month, position))
+        if not months:
+            return None
+
+    month_positions = {position for _, position in months}
+    columns = {}
+    for field, headers in spec["fields"].items():
+        for position, label in enumerate(labels):
+            if label in headers and position not in month_positions and position not in columns.values():
+                columns[field] = position
+                break
+
+    missing = [field for field in spec["fields"] if field not in columns]
+    if missing == ['account_name'] and len(months) >= 3:
+        # No account header: the names are in the column left of the first month
+        candidates = [position for position in range(months[0][1]) if position not in columns.values()]
+        if candidates:
+            columns['account_name'] = candidates[-1]
+            missing = []
+
+    if missing:
+        return None
+    return columns, months
+
+def find_layout(sheet_name: str, rows: Sequence[tuple]) -> Optional[SheetLayout]:
+    """Scan the top of a sheet for its header row."""
+    spec = LAYOUT_SPECS[sheet_name]
+    for index, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        match = match_header_row(row, spec)
+        if match:
+            columns, months = match
+            return SheetLayout(header_row=index, columns=columns, months=months)
+    return None
+
+def layout_matches(sheet_name: str, layout: SheetLayout, rows: Sequence[tuple]) -> bool:
+    """Whether a cached layout still fits the sheet; only its header row is checked."""
+    if not layout.detected:
+        return True
+    if layout.header_row >= len(rows):
+        return False
+    return match_header_row(rows[layout.header_row], LAYOUT_SPECS[sheet_name]) == (layout.columns, layout.months)
+
+def detect_layout(sheet_name: str, rows: Sequence[tuple]) -> Optional[SheetLayout]:
+    """
+    Find the header row and column positions of a sheet.
+
+    Layouts are cached by template fingerprint (the sheet's header block),
+    so a template seen before is looked up instead of scanned. When no
+    header row is found, the layout of the reference template is used.
+
+    Args:
+        sheet_name: Name of the sheet, as in SHEET_PROCESSORS
+        rows: The first rows of the sheet; HEADER_SCAN_ROWS are enough
+
+    Returns:
+        The sheet's layout, or None for sheets without a layout spec
+    """
+    global _cache_hits, _cache_misses
+
+    if sheet_name not in LAYOUT_SPECS:
+        return None
+
+    key = (sheet_name, fingerprint(sheet_name, rows))
+    with _cache_lock:
+        layout = _cache.get(key)
+        if layout is not None:
+            _cache.move_to_end(key)
+
+    if layout is not None and layout_matches(sheet_name, layout, rows):
+        with _cache_lock:
+            _cache_hits += 1
+        return layout
+
+    layout = find_layout(sheet_name, rows)
+    if layout is None:
+        logger.warning(f"No header row found in sheet '{sheet_name}', using the default layout")
+        layout = DEFAULT_LAYOUTS[sheet_name]
+    else:
+        logger.info(f"Detected layout of sheet '{sheet_name}': header row {layout.header_row}, columns {layout.columns}, "
+                    f"months {[month for month, _ in layout.months]}")
+
+    with _cache_lock:
+        _cache_misses += 1
+        _cache[key] = layout
+        while len(_cache) > LAYOUT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return layout
+
+def layout_cache_stats() -> Dict[str, int]:
+    """Hits, misses and size of the layout cache."""
+    with _cache_lock:
+        return {"hits": _cache_hits, "misses": _cache_misses, "size": len(_cache)}
+
+def clear_layout_cache():
+    global _cache_hits, _cache_misses
+    with _cache_lock:
+        _cache.clear()
+        _cache_hits = 0
+        _cache_misses = 0
@@ -0,0 +1,95 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Process-wide metrics in the Prometheus format. The API serves them at
+# /metrics; the Celery worker serves its own on WORKER_METRICS_PORT.
+
+# Buckets from 10 ms to 10 minutes: a sheet parses in well under a second,
+# a large workbook can take minutes end to end
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Time spent in each stage of report ingestion",
+    ["stage"],
+    buckets=DURATION_BUCKETS
+)
+
+INGEST_SHEET_SECONDS = Histogram(
+    "ingest_sheet_seconds",
+    "Time spent parsing each sheet",
+    ["sheet"],
+    buckets=DURATION_BUCKETS
+)
+
+INGEST_ROWS = Counter(
+    "ingest_rows_total",
+    "Rows written by report ingestion",
+    ["table"]
+)
+
+INGEST_REJECTED_CELLS = Counter(
+    "ingest_rejected_cells_total",
+    "Non-empty cells that could not be parsed as numbers",
+    ["sheet"]
+)
+
+INGEST_REPORTS = Counter(
+    "ingest_reports_total",
+    "Ingested reports by outcome",
+    ["status"]
+)
+
+INGEST_PEAK_RSS_BYTES = Gauge(
+    "ingest_peak_rss_bytes",
+    "Peak resident memory of the process during the last ingestion"
+)
+
+UPLOAD_BYTES = Counter(
+    "upload_bytes_total",
+    "Bytes of uploaded report files saved to disk"
+)
+
+# Buckets from 1 ms to 30 s: a connection is normally checked out at once;
+# waits come from an exhausted pool, up to its timeout
+POOL_CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to check a connection out of a database pool, including the pre-ping",
+    ["pool"],
+    buckets=POOL_CHECKOUT_BUCKETS
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections of a database pool currently checked out",
+    ["pool"]
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections of a database pool open beyond its size",
+    ["pool"]
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Read endpoint requests by response cache result (hit, miss or not_modified)",
+    ["endpoint", "result"]
+)
+
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    "response_cache_invalidations_total",
+    "Invalidations of a user's cached responses after a report was processed"
+)
+
+REPORT_ARCHIVE_SECONDS = Histogram(
+    "report_archive_seconds",
+    "Time to archive a report's rows to Parquet, or to rehydrate them",
+    ["operation"],
+    buckets=DURATION_BUCKETS
+)
+
+def render_metrics():
+    """Return the metrics of this process as (body, content type)."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,161 @@
+import logging
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# On PostgreSQL, pnl_data is partitioned by the year of its month column:
+# pnl_data_y2024 holds the rows of "2024-01" to "2024-12". Rows of a year
+# without a partition land in pnl_data_default until one is created. Other
+# databases keep a plain table and these functions do nothing.
+PARTITIONED_TABLE = "pnl_data"
+DEFAULT_PARTITION = "pnl_data_default"
+PARTITION_PREFIX = "pnl_data_y"
+
+def partition_name(year: int) -> str:
+    return f"{PARTITION_PREFIX}{year}"
+
+def is_partitioned(conn: Connection) -> bool:
+    """Whether pnl_data is a partitioned table."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": PARTITIONED_TABLE}).first() is not None
+
+def partition_years(conn: Connection) -> List[int]:
+    """Years that have a partition of pnl_data."""
+    names = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": PARTITIONED_TABLE}).scalars()
+    return sorted(int(name[len(PARTITION_PREFIX):]) for name in names if name.startswith(PARTITION_PREFIX))
+
+def _years_in(conn: Connection, table: str) -> List[int]:
+    return [int(year) for year in conn.execute(text(
+        f"SELECT DISTINCT substr(month, 1, 4) FROM {table} WHERE month ~ '^[0-9]{{4}}'"
+    )).scalars()]
+
+def create_year_partition(conn: Connection, year: int) -> bool:
+    """
+    Create the partition of a year unless it exists.
+
+    Rows of the year already in the default partition are moved into the
+    new one: the default partition is detached meanwhile, which PostgreSQL
+    requires, under the same lock on pnl_data as the creation.
+
+    Returns:
+        Whether the partition was created
+    """
+    if year in partition_years(conn):
+        return False
+
+    bounds = {"start": str(year), "end": str(year + 1)}
+    create = f"CREATE TABLE {partition_name(year)} PARTITION OF {PARTITIONED_TABLE} FOR VALUES FROM ('{year}') TO ('{year + 1}')"
+    stray = conn.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE month >= :start AND month < :end LIMIT 1"
+    ), bounds).first()
+
+    if stray is None:
+        conn.execute(text(create))
+    else:
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        conn.execute(text(create))
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE month >= :start AND month < :end RETURNING *) "
+            f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM moved"
+        ), bounds)
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+    logger.info(f"Created partition {partition_name(year)}")
+    return True
+
+def ensure_partitions(conn: Connection, through_year: Optional[int] = None) -> List[int]:
+    """
+    Create the missing yearly partitions of pnl_data.
+
+    That is a partition for every year with rows in the default partition,
+    and for every year from the current one to through_year, so that the
+    coming years' rows go straight to their own partition.
+
+    Args:
+        conn: Connection to the database, in a transaction
+        through_year: Last year to create ahead; the next year if omitted
+
+    Returns:
+        Years whose partition was created
+    """
+    if not is_partitioned(conn):
+        return []
+
+    current = date.today().year
+    through_year = through_year if through_year is not None else current + 1
+    years = set(_years_in(conn, DEFAULT_PARTITION)) | set(range(current, through_year + 1))
+    return [year for year in sorted(years) if create_year_partition(conn, year)]
+
+def drop_empty_partitions(conn: Connection, before_year: int) -> List[int]:
+    """
+    Drop the partitions of years before before_year that hold no rows.
+
+    Once the reports of those years are archived their partitions are
+    empty; dropping them keeps pnl_data to the years still in use. Rows
+    rehydrated into a dropped year go to the default partition, until
+    ensure_partitions creates the year again.
+
+    Returns:
+        Years whose partition was dropped
+    """
+    if not is_partitioned(conn):
+        return []
+
+    dropped = []
+    for year in partition_years(conn):
+        if year >= before_year:
+            continue
+        if conn.execute(text(f"SELECT 1 FROM {partition_name(year)} LIMIT 1")).first() is None:
+            conn.execute(text(f"DROP TABLE {partition_name(year)}"))
+            dropped.append(year)
+            logger.info(f"Dropped empty partition {partition_name(year)}")
+    return dropped
+
+def partition_pnl_data(conn: Connection):
+    """
+    Turn a plain pnl_data table into one partitioned by year.
+
+    The rows are copied into a partitioned table of the same columns with a
+    partition for each of their years. Partitioned tables need the
+    partition key in their primary key, which becomes (id, month); ids keep
+    coming from the same sequence. Indexes are built once the rows are in.
+    """
+    if conn.dialect.name != "postgresql" or is_partitioned(conn):
+        return
+
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} RENAME TO {PARTITIONED_TABLE}_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {PARTITIONED_TABLE}_id_seq OWNED BY NONE"))
+    conn.execute(text(
+        f"CREATE TABLE {PARTITIONED_TABLE} (LIKE {PARTITIONED_TABLE}_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (month)"
+    ))
+    conn.execute(text(f"ALTER SEQUENCE {PARTITIONED_TABLE}_id_seq OWNED BY {PARTITIONED_TABLE}.id"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} DEFAULT"))
+
+    for year in sorted(set(_years_in(conn, f"{PARTITIONED_TABLE}_unpartitioned"))):
+        create_year_partition(conn, year)
+    ensure_partitions(conn)
+
+    conn.execute(text(f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {PARTITIONED_TABLE}_unpartitioned"))
+    conn.execute(text(f"DROP TABLE {PARTITIONED_TABLE}_unpartitioned"))
+
+    statements = [
+        f"ALTER TABLE {PARTITIONED_TABLE} ADD PRIMARY KEY (id, month)",
+        f"ALTER TABLE {PARTITIONED_TABLE} ADD FOREIGN KEY (report_id) REFERENCES reports (id)",
+        f"CREATE INDEX ix_pnl_data_id ON {PARTITIONED_TABLE} (id)",
+        f"CREATE INDEX ix_pnl_data_report_account ON {PARTITIONED_TABLE} (report_id, account_name)",
+        f"CREATE INDEX ix_pnl_data_report_category ON {PARTITIONED_TABLE} (report_id, category)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
@@ -0,0 +1,151 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from ..models import PnLSeries
+
+# Values per packed series: the months of a year, January first
+SERIES_LENGTH = 12
+
+# Little-endian float64, whatever the platform
+SERIES_DTYPE = np.dtype("<f8")
+
+def pack_pnl_series(records: pd.DataFrame) -> Dict[str, list]:
+    """
+    Pack long-format P&L records into pnl_series columns.
+
+    Records come one per account and month, in the sheet's row order and,
+    within a row, month order (see melt_monthly_values). Each run of
+    records of one account, category and year whose months increase makes
+    one series: a new sheet row starts where the account changes or the
+    months start over. Unpacking the series (ReportSeries.to_frame) gives
+    the records back in the same order.
+
+    Args:
+        records: DataFrame with account_name, category, month ("YYYY-MM") and actuals columns
+
+    Returns:
+        Columns account_name, category, year, actuals and forecast, the values packed as bytes
+    """
+    if records.empty:
+        return {column: [] for column in ("account_name", "category", "year", "actuals", "forecast")}
+
+    accounts = records['account_name'].to_numpy()
+    categories = records['category'].to_numpy()
+    years = records['month'].str[:4].astype(int).to_numpy()
+    slots = records['month'].str[5:7].astype(int).to_numpy() - 1
+
+    starts = np.ones(len(records), dtype=bool)
+    starts[1:] = (
+        (accounts[1:] != accounts[:-1]) | (categories[1:] != categories[:-1]) |
+        (years[1:] != years[:-1]) | (slots[1:] <= slots[:-1])
+    )
+    series_index = np.cumsum(starts) - 1
+
+    values = np.full((starts.sum(), SERIES_LENGTH), np.nan, dtype=SERIES_DTYPE)
+    values[series_index, slots] = records['actuals'].to_numpy(dtype=float)
+
+    return {
+        "account_name": accounts[starts].tolist(),
+        "category": categories[starts].tolist(),
+        "year": years[starts].tolist(),
+        "actuals": [row.tobytes() for row in values],
+        "forecast": [None] * len(values)
+    }
+
+def unpack_values(blobs: Sequence[Optional[bytes]]) -> np.ndarray:
+    """
+    Decode packed series into an array of one row per series.
+
+    The blobs are joined into one buffer that the array reads in place;
+    missing blobs (None) become rows of NaN.
+    """
+    present = [blob is not None for blob in blobs]
+    if blobs and all(present):
+        return np.frombuffer(b"".join(blobs), dtype=SERIES_DTYPE).reshape(-1, SERIES_LENGTH)
+
+    values = np.full((len(blobs), SERIES_LENGTH), np.nan, dtype=SERIES_DTYPE)
+    if any(present):
+        values[present] = unpack_values([blob for blob in blobs if blob is not None])
+    return values
+
+class ReportSeries(NamedTuple):
+    """
+    P&L series of a report, one row per account row of its sheets.
+
+    actuals and forecast have SERIES_LENGTH columns, the months of the
+    row's year; NaN marks a month without a value.
+    """
+    account_names: List[str]
+    categories: List[str]
+    years: np.ndarray
+    actuals: np.ndarray
+    forecast: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        The long-format records of the series: one per account row and
+        month with an actual value, in sheet order, like the pnl_data rows.
+
+        Returns:
+            DataFrame with account_name, category, month, actuals and forecast (None where missing) columns
+        """
+        rows, slots = np.nonzero(~np.isnan(self.actuals))  # row-major, as the records were
+        months = pd.Series(self.years[rows]).astype(str) + "-" + pd.Series(slots + 1).astype(str).str.zfill(2)
+        forecast = self.forecast[rows, slots].astype(object)
+        forecast[np.isnan(self.forecast[rows, slots])] = None
+
+        return pd.DataFrame({
+            "account_name": np.asarray(self.account_names, dtype=object)[rows],
+            "category": np.asarray(self.categories, dtype=object)[rows],
+            "month": months.to_numpy(),
+            "actuals": self.actuals[rows, slots],
+            "forecast": forecast
+        })
+
+def load_report_series(
+    db: Session,
+    report_id: int,
+    account_names: Optional[Sequence[str]] = None,
+    categories: Optional[Sequence[str]] = None
+) -> Optional[ReportSeries]:
+    """
+    Load the packed P&L series of a report in one query.
+
+    Only the columns are selected, without building ORM objects, and the
+    values of all rows are decoded at once with NumPy.
+
+    Args:
+        db: Database session
+        report_id: ID of the report
+        account_names: Only load these accounts
+        categories: Only load these categories
+
+    Returns:
+        ReportSeries in sheet order, or None when the report has no series
+        (it was ingested before they were written; read its pnl_data rows)
+    """
+    query = db.query(
+        PnLSeries.account_name, PnLSeries.category, PnLSeries.year, PnLSeries.actuals, PnLSeries.forecast
+    ).filter(PnLSeries.report_id == report_id)
+    if account_names is not None:
+        query = query.filter(PnLSeries.account_name.in_(account_names))
+    if categories is not None:
+        query = query.filter(PnLSeries.category.in_(categories))
+    rows = query.order_by(PnLSeries.id).all()
+
+    if not rows:
+        filtered = account_names is not None or categories is not None
+        if not filtered or db.query(PnLSeries.id).filter(PnLSeries.report_id == report_id).first() is None:
+            return None
+
+    account_names, categories, years, actuals, forecast = zip(*rows) if rows else ((), (), (), (), ())
+    return ReportSeries(
+        account_names=list(account_names),
+        categories=list(categories),
+        years=np.array(years, dtype=int),
+        actuals=unpack_values(actuals),
+        forecast=unpack_values(forecast)
+    )
@@ -0,0 +1,196 @@
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, literal, union_all
+from sqlalchemy.orm import Session
+
+from ..models import Report, PnLData
+
+# How each metric is read from a report's P&L rows: the field matched, the
+# value it must have and the aggregate. "first" is the actuals of the first
+# matching row in sheet order (see pnl_row_order), as the endpoints have
+# always read a single account; "sum" adds up all matching rows.
+SERIES_METRICS: Dict[str, Tuple[str, str, str]] = {
+    "revenue": ("account_name", "Group Revenue", "first"),
+    "gross_profit": ("account_name", "Gross Profit", "first"),
+    "net_profit": ("account_name", "Net Profit before Tax", "first"),
+    "direct_costs": ("category", "Direct Costs", "first"),
+    "opex": ("category", "Opex", "sum"),
+}
+
+# Rank of each P&L sheet in a report's row order
+PNL_SHEET_ORDER = {"PnL Summary": 0, "RECONCILIATION": 1}
+
+def pnl_row_order(columns) -> list:
+    """
+    ORDER BY terms putting a report's P&L rows in sheet order.
+
+    The P&L Summary rows come first, each sheet's rows top to bottom and a
+    row's months in order. Rows stored without a position are ordered by
+    id, the order they were inserted in.
+
+    Args:
+        columns: PnLData, or the columns (.c) of a select of its rows with
+            id, sheet, sheet_row and month
+    """
+    return [
+        case(PNL_SHEET_ORDER, value=columns.sheet, else_=len(PNL_SHEET_ORDER)),
+        func.coalesce(columns.sheet_row, columns.id),
+        columns.month,
+        columns.id
+    ]
+
+def shift_month(month: str, offset: int) -> str:
+    """
+    Move a month forwards or backwards, across years as needed.
+
+    Args:
+        month: Month in "YYYY-MM" format
+        offset: Number of months to move by; negative moves back
+
+    Returns:
+        Month in "YYYY-MM" format, e.g. shift_month("2025-01", -1) == "2024-12"
+    """
+    date = datetime.strptime(month, "%Y-%m")
+    index = date.year * 12 + date.month - 1 + offset
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def months_between(start: str, end: str) -> int:
+    """Number of months from start to end, e.g. months_between("2024-12", "2025-02") == 2."""
+    start_date = datetime.strptime(start, "%Y-%m")
+    end_date = datetime.strptime(end, "%Y-%m")
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month
+
+def month_range(end: str, count: int) -> List[str]:
+    """The count months ending with end, oldest first."""
+    return [shift_month(end, offset) for offset in range(1 - count, 1)]
+
+class PeriodSeries(NamedTuple):
+    """
+    Metrics of a user's processed reports over a range of months.
+
+    values has one row per month, oldest first, and one column per metric;
+    it holds NaN where the month has no processed report or its report has
+    no row for the metric. Series read from the KPI rollup also carry the
+    month-over-month and year-over-year changes, shaped like values.
+    """
+    months: List[str]
+    metrics: Tuple[str, ...]
+    values: np.ndarray
+    report_ids: List[Optional[int]]
+    mom: Optional[np.ndarray] = None
+    yoy: Optional[np.ndarray] = None
+
+    def report_id(self, month: str) -> Optional[int]:
+        """ID of the month's processed report, or None when there is none or the month is out of range."""
+        try:
+            return self.report_ids[self.months.index(month)]
+        except ValueError:
+            return None
+
+    def get(self, month: str, metric: str, default: Optional[float] = None) -> Optional[float]:
+        """Value of a metric for a month, or default when it has none."""
+        return self._at(self.values, month, metric, default)
+
+    def get_mom(self, month: str, metric: str, default: Optional[float] = None) -> Optional[float]:
+        """Month-over-month change of a metric, or default when it has none."""
+        return self._at(self.mom, month, metric, default)
+
+    def get_yoy(self, month: str, metric: str, default: Optional[float] = None) -> Optional[float]:
+        """Year-over-year change of a metric, or default when it has none."""
+        return self._at(self.yoy, month, metric, default)
+
+    def _at(self, array: Optional[np.ndarray], month: str, metric: str, default: Optional[float]) -> Optional[float]:
+        if array is None or self.report_id(month) is None:
+            return default
+        value = array[self.months.index(month), self.metrics.index(metric)]
+        return default if np.isnan(value) else float(value)
+
+def load_series(db: Session, owner_id: int, end: str, count: int, metrics: Sequence[str]) -> PeriodSeries:
+    """
+    Load metrics of a user's processed reports for a range of months in one query.
+
+    The matching P&L rows of the reports in the range are grouped per
+    report and metric; each group gives its sum and its first row in sheet
+    order. Reports are outer joined so that months whose report has none
+    of the rows are still known to have a report.
+
+    Args:
+        db: Database session
+        owner_id: ID of the user
+        end: Last month of the range, in "YYYY-MM" format
+        count: Number of months in the range, end included
+        metrics: Names of the metrics to load, from SERIES_METRICS
+
+    Returns:
+        PeriodSeries of the range
+    """
+    months = month_range(end, count)
+    metrics = tuple(metrics)
+
+    reports = db.query(Report.id).filter(
+        Report.owner_id == owner_id,
+        Report.is_processed == True,
+        Report.month >= months[0],
+        Report.month <= months[-1]
+    )
+
+    # One select per field, tagging each row with the value it matched;
+    # each is served by the (report_id, field) index
+    selects = []
+    for field in sorted({SERIES_METRICS[metric][0] for metric in metrics}):
+        column = getattr(PnLData, field)
+        values = sorted({SERIES_METRICS[metric][1] for metric in metrics if SERIES_METRICS[metric][0] == field})
+        selects.append(db.query(
+            PnLData.id.label("id"),
+            PnLData.report_id.label("report_id"),
+            literal(field).label("field"),
+            column.label("value"),
+            PnLData.actuals.label("actuals"),
+            PnLData.sheet.label("sheet"),
+            PnLData.sheet_row.label("sheet_row"),
+            PnLData.month.label("month")
+        ).filter(PnLData.report_id.in_(reports.statement), column.in_(values)).statement)
+    selected = union_all(*selects).subquery()
+
+    group = (selected.c.report_id, selected.c.field, selected.c.value)
+    ranked = db.query(
+        *group,
+        selected.c.actuals.label("first"),
+        func.sum(selected.c.actuals).over(partition_by=group).label("total"),
+        func.row_number().over(partition_by=group, order_by=pnl_row_order(selected.c)).label("position")
+    ).subquery()
+
+    figures = db.query(
+        ranked.c.report_id, ranked.c.field, ranked.c.value, ranked.c.first, ranked.c.total
+    ).filter(ranked.c.position == 1).subquery()
+
+    rows = db.query(
+        Report.id, Report.month, figures.c.field, figures.c.value, figures.c.first, figures.c.total
+    ).outerjoin(figures, figures.c.report_id == Report.id).filter(
+        Report.owner_id == owner_id,
+        Report.is_processed == True,
+        Report.month >= months[0],
+        Report.month <= months[-1]
+    ).all()
+
+    positions = {month: position for position, month in enumerate(months)}
+    columns: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+    for column, metric in enumerate(metrics):
+        field, value, aggregate = SERIES_METRICS[metric]
+        columns.setdefault((field, value), []).append((column, aggregate))
+
+    values = np.full((len(months), len(metrics)), np.nan)
+    report_ids: List[Optional[int]] = [None] * len(months)
+    for report_id, month, field, value, first, total in rows:
+        position = positions.get(month)
+        if position is None:
+            continue
+        report_ids[position] = report_id
+        for column, aggregate in columns.get((field, value), []):
+            figure = first if aggregate == "first" else total
+            if figure is not None:
+                values[position, column] = figure
+
+    return PeriodSeries(months=months, metrics=metrics, values=values, report_ids=report_ids)
@@ -0,0 +1,187 @@
+import io
+import json
+import os
+import re
+import zipfile
+import logging
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .file_handler import original_filename
+
+logger = logging.getLogger(__name__)
+
+# Uploads with these extensions hold CSV/Parquet exports instead of a workbook
+TABULAR_EXTENSIONS = ('.zip', '.csv', '.parquet')
+
+MANIFEST_NAME = 'manifest.json'
+
+def is_tabular_source(file_path: str) -> bool:
+    """Whether the file is a CSV/Parquet export (or a bundle of them) rather than an xlsx workbook."""
+    return os.path.splitext(file_path)[1].lower() in TABULAR_EXTENSIONS
+
+def normalize_role(name: str) -> str:
+    """Normalize a sheet or file name for matching, e.g. "PnL Summary" and "pnl_summary.csv" both give "pnlsummary"."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return re.sub(r'[^a-z0-9]', '', stem.lower())
+
+def tabular_sheets(file_path: str, sheet_names: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    List the sheets held by a CSV/Parquet export.
+
+    The source is either a single CSV/Parquet file named after its sheet
+    or a zip of such files. A manifest.json inside the zip can map sheet
+    names to members of the zip:
+
+        {"sheets": {"PnL Summary": "pnl.parquet", "RECONCILIATION": "recon.csv"}}
+
+    Without one, files are matched to sheets by the name they were uploaded
+    under ("pnl_summary.csv", "Red flags.parquet", ...).
+
+    Args:
+        file_path: Path to the saved CSV, Parquet or zip file
+        sheet_names: Names of the sheets that are ingested
+
+    Returns:
+        (sheet name, file) pairs in the order of sheet_names; files inside a
+        zip are given as their member names
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == '.zip':
+        with zipfile.ZipFile(file_path) as archive:
+            members = [name for name in archive.namelist() if not name.endswith('/')]
+            return resolve_mapping(members, sheet_names, read_manifest(archive, members))
+
+    # Saved uploads carry a prefix that makes their name unique
+    return [
+        (sheet_name, file_path)
+        for sheet_name, _ in resolve_mapping([original_filename(file_path)], sheet_names, None)
+    ]
+
+def read_tabular_sheet(
+    file_path: str,
+    member: str,
+    used: Callable[[List[str]], Optional[Sequence[int]]]
+) -> pd.DataFrame:
+    """
+    Read one sheet of a CSV/Parquet export as returned by tabular_sheets.
+
+    The file holds the sheet laid out as in the workbook, its first row or
+    column names being the sheet's header row. Only the columns in use are
+    parsed; the others come back empty so that column positions still match
+    the sheet.
+
+    Args:
+        file_path: Path to the saved CSV, Parquet or zip file
+        member: File holding the sheet
+        used: Given the file's column names, returns the positions of the
+            columns to parse, or None to parse them all
+
+    Returns:
+        DataFrame of the sheet below its header row
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == '.zip':
+        with zipfile.ZipFile(file_path) as archive:
+            # Parquet needs a seekable source, which zip members are not cheaply
+            return read_table(member, io.BytesIO(archive.read(member)), used)
+
+    return read_table(member, member, used)
+
+def read_manifest(archive: zipfile.ZipFile, members: List[str]) -> Optional[dict]:
+    for member in members:
+        if os.path.basename(member).lower() == MANIFEST_NAME:
+            return json.loads(archive.read(member))
+    return None
+
+def resolve_mapping(
+    files: List[str],
+    sheet_names: Sequence[str],
+    manifest: Optional[dict]
+) -> List[Tuple[str, str]]:
+    """
+    Pair each known sheet with the file holding it, in the order of sheet_names.
+
+    A manifest can only name files that are in files, the members of the
+    uploaded zip, so it never reaches outside the upload.
+    """
+    roles = {normalize_role(sheet_name): sheet_name for sheet_name in sheet_names}
+    by_sheet = {}
+
+    if manifest is not None:
+        for name, member in manifest.get('sheets', {}).items():
+            sheet_name = roles.get(normalize_role(name))
+            if sheet_name is None:
+                logger.warning(f"Manifest entry '{name}' does not match a known sheet, skipping")
+                continue
+            if member not in files:
+                raise ValueError(f"Manifest entry '{name}' refers to '{member}', which is not in the zip")
+            by_sheet[sheet_name] = member
+    else:
+        for member in files:
+            if not member.lower().endswith(('.csv', '.parquet')):
+                continue
+            sheet_name = roles.get(normalize_role(member))
+            if sheet_name is not None:
+                by_sheet[sheet_name] = member
+
+    if not by_sheet:
+        raise ValueError("No CSV or Parquet file matches a known sheet")
+
+    return [(sheet_name, by_sheet[sheet_name]) for sheet_name in sheet_names if sheet_name in by_sheet]
+
+def read_table(name: str, source, used: Callable[[List[str]], Optional[Sequence[int]]]) -> pd.DataFrame:
+    """Read one CSV or Parquet file as a sheet frame."""
+    if name.lower().endswith('.parquet'):
+        return read_parquet_sheet(source, used)
+    return read_csv_sheet(source, used)
+
+def read_csv_sheet(source, used: Callable[[List[str]], Optional[Sequence[int]]]) -> pd.DataFrame:
+    """
+    Read a CSV export as a sheet frame, parsing only the columns in use.
+
+    CSV has no types, so a column whose cells all parse as numbers becomes
+    a float column and any other keeps its text, with None for empty cells,
+    as a DataFrame built from the cells of a workbook would.
+    """
+    names = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    positions = used(names)
+    df = pd.read_csv(
+        source, dtype=str, keep_default_na=False, na_values=[''],
+        usecols=None if positions is None else [position for position in positions if position < len(names)]
+    )
+
+    for column in df.columns:
+        values = df[column]
+        numbers = pd.to_numeric(values, errors='coerce')
+        if numbers.notna().sum() == values.notna().sum():
+            df[column] = numbers
+        else:
+            mixed = numbers.astype(object).where(numbers.notna(), values)
+            df[column] = mixed.where(values.notna(), None)
+
+    return df.reindex(columns=names)
+
+def read_parquet_sheet(source, used: Callable[[List[str]], Optional[Sequence[int]]]) -> pd.DataFrame:
+    """
+    Read a Parquet export as a sheet frame, loading only the columns in use.
+
+    Only the projected column chunks are decoded.
+    """
+    import pyarrow.parquet as pq
+
+    names = pq.read_schema(source).names
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    positions = used(names)
+    columns = None if positions is None else [names[position] for position in positions if position < len(names)]
+    df = pd.read_parquet(source, columns=columns)
+
+    return df.reindex(columns=names)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from .metrics import (
+    INGEST_STAGE_SECONDS, INGEST_SHEET_SECONDS, INGEST_ROWS,
+    INGEST_REJECTED_CELLS, INGEST_PEAK_RSS_BYTES, UPLOAD_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between samples of the resident memory during an ingestion
+MEMORY_SAMPLE_SECONDS = float(os.getenv("INGEST_MEMORY_SAMPLE_SECONDS", "0.05"))
+
+# Tables that hold rows of another table again, in another form, and do
+# not count as rows a sheet produced: the packed P&L series repeat pnl_data
+PACKED_TABLES = ("pnl_series",)
+
+# Stats of the sheet being parsed in the current thread, for code deep in
+# the sheet processors
+_current: ContextVar[Optional["IngestionStats"]] = ContextVar("ingestion_stats", default=None)
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident memory of the process now, or None where it cannot be read (outside Linux)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def sheet_rows(writer) -> int:
+    """Rows a writer has received, not counting those of PACKED_TABLES."""
+    return sum(rows for table, rows in writer.rows_added.items() if table not in PACKED_TABLES)
+
+class IngestionStats:
+    """
+    Timings and counts of one report's ingestion.
+
+    Collects the time spent in each stage (file save, parsing, category
+    mapping, database writes, commit), and per sheet the parse time, rows
+    produced and cells that could not be parsed. Each measurement is also
+    exported to the process's Prometheus metrics as it is taken. The
+    result is stored as JSON on the Report.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.stages: Dict[str, float] = dict(data.get("stages", {}))
+        self.sheets: Dict[str, Dict[str, float]] = dict(data.get("sheets", {}))
+        self.rows: Dict[str, int] = dict(data.get("rows", {}))
+        self.upload_bytes: Optional[int] = data.get("upload_bytes")
+        self.peak_rss_mb: Optional[float] = data.get("peak_rss_mb")
+        self.rss_growth_mb: Optional[float] = data.get("rss_growth_mb")
+        self._sheet: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> "IngestionStats":
+        """Load stats stored on a Report; an empty value gives empty stats."""
+        return cls(json.loads(text) if text else None)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            "sheets": {
+                name: {key: round(value, 4) if isinstance(value, float) else value for key, value in sheet.items()}
+                for name, sheet in self.sheets.items()
+            },
+            "rows": self.rows,
+            "upload_bytes": self.upload_bytes,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rss_growth_mb": self.rss_growth_mb,
+            "total_seconds": round(sum(self.stages.values()) - self.stages.get("categorize", 0.0), 4)
+        }
+
+    def add_stage(self, stage: str, seconds: float):
+        """Record time spent in a stage; repeated stages add up."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        INGEST_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time the enclosed block as a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def sheet(self, sheet_name: str, writer):
+        """
+        Time the parsing of a sheet and count the rows it adds to the writer
+        (see sheet_rows).
+
+        While the block runs, record_rejected and timed inside the sheet
+        processors report to these stats.
+        """
+        rows_before = sheet_rows(writer)
+        token = _current.set(self)
+        self._sheet = sheet_name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._sheet = None
+            _current.reset(token)
+            self.add_sheet(sheet_name, seconds, sheet_rows(writer) - rows_before, 0)
+
+    def add_sheet(self, sheet_name: str, seconds: float, rows: int, rejected_cells: int):
+        """Record a parsed sheet, e.g. one parsed in a worker process."""
+        sheet = self.sheets.setdefault(sheet_name, {"seconds": 0.0, "rows": 0, "rejected_cells": 0})
+        sheet["seconds"] += seconds
+        sheet["rows"] += rows
+        INGEST_SHEET_SECONDS.labels(sheet=sheet_name).observe(seconds)
+        self.reject(rejected_cells, sheet_name)
+
+    def reject(self, count: int, sheet_name: Optional[str] = None):
+        """Count cells that held something but could not be parsed."""
+        sheet_name = sheet_name or self._sheet
+        if not count or not sheet_name:
+            return
+        sheet = self.sheets.setdefault(sheet_name, {"seconds": 0.0, "rows": 0, "rejected_cells": 0})
+        sheet["rejected_cells"] += count
+        INGEST_REJECTED_CELLS.labels(sheet=sheet_name).inc(count)
+
+    def record_upload(self, size: int, seconds: float):
+        self.upload_bytes = size
+        self.add_stage("save", seconds)
+        UPLOAD_BYTES.inc(size)
+
+    def record_rows(self, rows: Dict[str, int]):
+        """Record the rows written per table."""
+        for table, count in rows.items():
+            self.rows[table] = self.rows.get(table, 0) + count
+            INGEST_ROWS.labels(table=table).inc(count)
+
+    @contextmanager
+    def memory(self):
+        """
+        Record the peak resident memory of the process while the block runs.
+
+        The memory is sampled every MEMORY_SAMPLE_SECONDS in a background
+        thread. peak_rss_mb is the highest sample, and rss_growth_mb how
+        far it rose above the memory at the start. This is the memory of
+        the whole process: reports ingested at the same time in other
+        threads add to it, while sheets parsed in the process pool do not.
+        """
+        start_rss = current_rss_bytes()
+        if start_rss is None:
+            yield
+            return
+
+        peak = [start_rss]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(MEMORY_SAMPLE_SECONDS):
+                peak[0] = max(peak[0], current_rss_bytes() or 0)
+
+        sampler = threading.Thread(target=sample, name="ingest-memory-sampler", daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            done.set()
+            sampler.join()
+            peak_rss = max(peak[0], current_rss_bytes() or 0)
+            self.peak_rss_mb = round(peak_rss / (1024 * 1024), 1)
+            self.rss_growth_mb = round((peak_rss - start_rss) / (1024 * 1024), 1)
+            INGEST_PEAK_RSS_BYTES.set(peak_rss)
+
+def record_rejected(count: int):
+    """Count unparseable cells against the sheet being parsed, if stats are being collected."""
+    stats = _current.get()
+    if stats is not None:
+        stats.reject(int(count))
+
+@contextmanager
+def timed(stage: str):
+    """Time the enclosed block as a stage of the ingestion in progress, if any."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    with stats.stage(stage):
+        yield
@@ -1,12 +1,29 @@
 from celery import Celery
+from celery.signals import worker_init
 import os
 
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
 # Configure Celery
-app = Celery('financial_management_app')
-app.config_from_object('celeryconfig')
+app = Celery(
+    'financial_management_app',
+    broker=os.getenv("CELERY_BROKER_URL", REDIS_URL),
+    backend=os.getenv("CELERY_RESULT_BACKEND", REDIS_URL),
+    include=['app.tasks']
+)
 
-# Set default Django settings module for celery
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+app.conf.update(
+    # Run tasks in-process (for tests and local development without a worker)
+    task_always_eager=os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() in ("1", "true", "yes"),
+    task_track_started=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
 
-# Import tasks
-# from app.tasks import prediction_task
\ No newline at end of file
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """Serve the worker's ingestion metrics for Prometheus to scrape."""
+    port = int(os.getenv("WORKER_METRICS_PORT", "9808"))
+    if port:
+        from prometheus_client import start_http_server
+        start_http_server(port)
\ No newline at end of file
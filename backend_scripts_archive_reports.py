@@ -0,0 +1,61 @@
+"""
+Archive the reports of old months and maintain the pnl_data partitions.
+
+Processed reports of months at least ARCHIVE_AFTER_MONTHS months before
+the current one have their P&L, series, red flag and entity rows moved to
+compressed Parquet files under ARCHIVE_DIR, one report per transaction.
+They keep their KPI rollup and stay listed, as Archived, and are
+rehydrated when their month is requested again.
+
+On PostgreSQL, the yearly partitions of pnl_data are then maintained: the
+partitions of years before the horizon that archiving emptied are dropped,
+and those of the current and next year are created ahead of time, along
+with any year whose rows went to the default partition. Run it daily, e.g.
+from cron.
+
+Usage (from the backend directory):
+    python -m scripts.archive_reports
+    python -m scripts.archive_reports --months 36 --user-id 3
+"""
+import argparse
+import logging
+import time
+from datetime import date
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app.utils.archive import ARCHIVE_AFTER_MONTHS, archive_reports
+from app.utils.partitions import drop_empty_partitions, ensure_partitions
+from app.utils.series import shift_month
+
+logger = logging.getLogger("archive_reports")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="Archive reports of months at least this many months old")
+    parser.add_argument("--user-id", type=int, help="Only archive this user's reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    horizon = shift_month(date.today().strftime("%Y-%m"), -args.months + 1)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        archived = archive_reports(db, horizon, owner_id=args.user_id)
+        logger.info(f"Archived {len(archived)} reports of months before {horizon} in {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+    with engine.begin() as conn:
+        dropped = drop_empty_partitions(conn, int(horizon[:4]))
+        created = ensure_partitions(conn)
+    if dropped or created:
+        logger.info(f"pnl_data partitions dropped: {dropped}, created: {created}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Backfill the KPI rollup from the processed reports.
+
+Reports processed before the kpi_rollup table existed have no rollup rows;
+the read endpoints then compute their KPIs from the P&L rows on every
+request. This rebuilds the rollup of every month with a processed report,
+one user per transaction. It is safe to run again: each month's rows are
+replaced. Archived reports are rehydrated to be read; the next archiving
+run archives them again.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_kpi_rollup
+    python -m scripts.backfill_kpi_rollup --user-id 3
+"""
+import argparse
+import logging
+import time
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app.models import Report
+from app.utils.archive import delete_archive, rehydrate_months
+from app.utils.kpi_rollup import rebuild_kpi_rollup
+from app.utils.series import month_range, months_between
+
+logger = logging.getLogger("backfill_kpi_rollup")
+
+def backfill_user(db, owner_id: int) -> int:
+    """Rebuild the rollup of all the months of a user's processed reports; returns the number of months."""
+    months = sorted(month for (month,) in db.query(Report.month).filter(
+        Report.owner_id == owner_id,
+        Report.is_processed == True
+    ).distinct())
+    if not months:
+        return 0
+
+    # Every month of the span, so that rows left over for months that no
+    # longer have a report are removed too
+    span = month_range(months[-1], months_between(months[0], months[-1]) + 1)
+    archives = rehydrate_months(db, owner_id, months[0], months[-1])
+    rebuild_kpi_rollup(db, owner_id, span)
+    db.commit()
+    for path in archives:
+        delete_archive(path)
+    return len(months)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="Only backfill this user's reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        if args.user_id is not None:
+            owner_ids = [args.user_id]
+        else:
+            owner_ids = [owner_id for (owner_id,) in db.query(Report.owner_id).filter(
+                Report.is_processed == True
+            ).distinct()]
+
+        for owner_id in owner_ids:
+            start = time.perf_counter()
+            months = backfill_user(db, owner_id)
+            logger.info(f"User {owner_id}: rebuilt the KPI rollup of {months} months in {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
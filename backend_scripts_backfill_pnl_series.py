@@ -0,0 +1,73 @@
+"""
+Backfill the packed P&L series from the P&L rows of processed reports.
+
+Reports processed before the pnl_series table existed have no series; the
+P&L endpoint then reads their pnl_data rows one by one. This packs the
+rows of each such report, in sheet order, one report per
+transaction. It is safe to run again: reports that already have series
+are skipped, as are archived reports, whose rows are in their archive.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_pnl_series
+    python -m scripts.backfill_pnl_series --user-id 3
+"""
+import argparse
+import logging
+import time
+
+import pandas as pd
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app.models import Report, PnLData, PnLSeries
+from app.utils.archive import ARCHIVED_STATUS
+from app.utils.bulk_writer import BulkWriter
+from app.utils.data_processor import PNL_COLUMNS, write_pnl_series
+from app.utils.series import pnl_row_order
+
+logger = logging.getLogger("backfill_pnl_series")
+
+def backfill_report(db, report_id: int) -> int:
+    """Pack the P&L rows of a report into series; returns the number of series written."""
+    rows = db.query(*(getattr(PnLData, column) for column in PNL_COLUMNS)).filter(
+        PnLData.report_id == report_id
+    ).order_by(*pnl_row_order(PnLData)).all()
+    records = pd.DataFrame(rows, columns=PNL_COLUMNS)
+
+    writer = BulkWriter(db)
+    write_pnl_series(records, report_id, writer)
+    writer.flush()
+    db.commit()
+    return writer.rows_written.get(PnLSeries.__tablename__, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="Only backfill this user's reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        packed = db.query(PnLSeries.report_id).distinct()
+        query = db.query(Report.id).filter(
+            Report.is_processed == True,
+            Report.status != ARCHIVED_STATUS,
+            Report.id.notin_(packed)
+        )
+        if args.user_id is not None:
+            query = query.filter(Report.owner_id == args.user_id)
+        report_ids = [report_id for (report_id,) in query.order_by(Report.id)]
+
+        for report_id in report_ids:
+            start = time.perf_counter()
+            series = backfill_report(db, report_id)
+            logger.info(f"Report {report_id}: packed {series} series in {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
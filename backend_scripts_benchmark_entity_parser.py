@@ -0,0 +1,48 @@
+"""
+Benchmark the Analysis Per Entity parser.
+
+Builds synthetic entity blocks in memory and times parse_entity_analysis_sheet
+for growing entity counts. The time per entity should stay flat, showing that
+parsing scales linearly with the size of the sheet.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_entity_parser --sizes 100 1000 5000 10000
+"""
+import argparse
+import time
+
+from app.utils.data_processor import parse_entity_analysis_sheet
+
+def build_rows(entity_count: int) -> list:
+    """Build the rows of an Analysis Per Entity sheet with the given number of entity blocks."""
+    rows = [("Entity", "Local", "Interco", "Total")]
+    for i in range(entity_count):
+        revenue = 1000.0 + i
+        cost = 600.0 + i
+        rows.append((f"Entity {i}", None, None, None))
+        rows.append(("Revenue", revenue * 0.8, revenue * 0.2, revenue))
+        rows.append(("Cost of Sales", cost * 0.7, cost * 0.3, cost))
+        rows.append(("Gross Profit", None, None, revenue - cost))
+    return rows
+
+def run(sizes: list, repeat: int):
+    print(f"{'entities':>10} {'rows':>10} {'best (ms)':>12} {'us/entity':>12}")
+    for size in sizes:
+        rows = build_rows(size)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            entities = parse_entity_analysis_sheet(iter(rows))
+            timings.append(time.perf_counter() - start)
+        
+        assert len(entities) == size
+        best = min(timings)
+        print(f"{size:>10} {len(rows):>10} {best * 1000:>12.2f} {best / size * 1e6:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    run(args.sizes, args.repeat)
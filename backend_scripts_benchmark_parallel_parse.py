@@ -0,0 +1,112 @@
+"""
+Benchmark parsing the sheets of a workbook sequentially and in the process pool.
+
+For growing synthetic workbooks, times read_workbook parsing the sheets one
+after another in this process against read_sheets_in_parallel, where each
+worker reloads the workbook to parse its sheet. The pool is timed cold
+(started for the run, as for the first ingestion of a worker) and warm.
+
+On a machine with fewer CPUs than sheets the workers share the CPUs, so the
+warm time is also projected to one CPU per sheet: the sheets' parse times
+in the workers add up on a shared CPU, and only the slowest one counts when
+they run side by side. The speedup is against that projection when the
+CPUs are shared, against the warm time otherwise. Set
+INGEST_PARALLEL_MIN_SIZE_MB around the uncompressed sheet size from which
+the speedup stays clearly above 1; nothing is written to the database.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_parallel_parse
+    python -m scripts.benchmark_parallel_parse --accounts 100 1000 5000 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from openpyxl import load_workbook
+
+from app.utils import data_processor
+from app.utils.bulk_writer import BulkWriter
+from app.utils.data_processor import (
+    SHEET_PROCESSORS, available_cpus, parse_sheet, read_sheets_in_parallel,
+    read_workbook, sheet_data_size
+)
+
+from .generate_workbook import generate_workbook
+
+YEAR = 2025
+
+def best_of(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def shutdown_pool():
+    """Drop the shared pool so the next parallel run starts it again."""
+    if data_processor._executor is not None:
+        data_processor._executor.shutdown(wait=True)
+        data_processor._executor = None
+
+def benchmark(path: str, workers: int, repeat: int) -> dict:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    sheet_names = [name for name in workbook.sheetnames if name in SHEET_PROCESSORS]
+    workbook.close()
+    workers = min(workers, len(sheet_names))
+
+    def sequential():
+        read_workbook(path, 1, YEAR, BulkWriter(None), workers=1)
+
+    def parallel():
+        read_sheets_in_parallel(path, sheet_names, 1, YEAR, BulkWriter(None), None, workers)
+
+    shutdown_pool()
+    start = time.perf_counter()
+    parallel()
+    cold = time.perf_counter() - start
+
+    warm = best_of(repeat, parallel)
+    sequential_seconds = best_of(repeat, sequential)
+
+    # What each worker does for its sheet: reload the workbook and parse it
+    worker_seconds = [best_of(repeat, lambda: parse_sheet(path, sheet_name, 1, YEAR)) for sheet_name in sheet_names]
+    shared_cpus = min(workers, available_cpus())
+    projected = warm - sum(worker_seconds) / shared_cpus + max(worker_seconds)
+    parallel_seconds = projected if shared_cpus < len(sheet_names) else warm
+
+    return {
+        "sheets": len(sheet_names),
+        "size_mb": sheet_data_size(path) / (1024 * 1024),
+        "sequential": sequential_seconds,
+        "cold": cold,
+        "warm": warm,
+        "projected": projected,
+        "speedup": sequential_seconds / parallel_seconds
+    }
+
+def run(accounts: list, workers: int, repeat: int):
+    print(f"{available_cpus()} CPUs available, {workers} workers")
+    print(f"{'accounts':>9} {'sheets MB':>10} {'sequential':>11} {'cold pool':>10} {'warm pool':>10} {'1 CPU/sheet':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in accounts:
+            path = generate_workbook(
+                os.path.join(directory, f"parallel_{count}.xlsx"), accounts=count,
+                entities=max(1, count // 10), red_flags=max(1, count // 4)
+            )
+            result = benchmark(path, workers, repeat)
+            print(
+                f"{count:>9} {result['size_mb']:>10.1f} {result['sequential']:>10.3f}s "
+                f"{result['cold']:>9.3f}s {result['warm']:>9.3f}s {result['projected']:>11.3f}s {result['speedup']:>8.2f}"
+            )
+    shutdown_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, nargs="+", default=[50, 200, 500, 1000, 2000, 5000, 10000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(args.accounts, args.workers, args.repeat)
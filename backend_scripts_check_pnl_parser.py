@@ -0,0 +1,163 @@
+"""
+Check the P&L parsers against the row-by-row parsers they replaced.
+
+Generates workbooks, overwrites some month cells with the values that
+exercise the coercion rules (text that is not a number, "0", zero,
+accounting strings with spaces, negative amounts in parentheses), then
+parses the P&L Summary and RECONCILIATION sheets both ways: with the
+current parsers, over the read-only row stream as ingestion does, and
+with the previous ones, over pd.read_excel frames, kept here verbatim
+apart from building records instead of ORM rows. The records must be the
+same, in the same order.
+
+Usage (from the backend directory):
+    python -m scripts.check_pnl_parser
+    python -m scripts.check_pnl_parser --accounts 2000 --seeds 0 1 2 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from app.utils.data_processor import (
+    PNL_COLUMNS, determine_category, month_to_number,
+    parse_pnl_summary_sheet, parse_reconciliation_sheet
+)
+
+from .generate_workbook import generate_workbook
+
+YEAR = 2025
+
+# Month cell values that take each branch of the coercion
+EDGE_VALUES = ["abc", "0", 0, "(1,234)", "$5,000", " 1,234.5 ", "(0)", "-", "$-", None, -42.5]
+
+def legacy_monthly_records(df: pd.DataFrame, months: list, type_column: bool) -> list:
+    """The loops of the previous process_pnl_summary_sheet and process_reconciliation_sheet."""
+    records = []
+    for _, row in df.iterrows():
+        account_name = row['account_name']
+
+        # Skip empty rows or headers
+        if pd.isna(account_name) or account_name in ['Account Name', '']:
+            continue
+
+        # Only process "Actual HL" rows
+        if type_column and row['type'] != 'Actual HL':
+            continue
+
+        category = determine_category(account_name)
+
+        for month in months:
+            value = row[month]
+
+            if pd.notna(value) and value != 0:
+                # Convert to numeric if it's a string
+                if isinstance(value, str):
+                    value = value.replace(',', '').replace('$', '').replace('(', '-').replace(')', '')
+                    try:
+                        value = float(value)
+                    except ValueError:
+                        continue
+
+                records.append((account_name, category, f"{YEAR}-{month_to_number(month)}", float(value)))
+    return records
+
+def legacy_pnl_summary(workbook_path: str) -> list:
+    df = pd.read_excel(workbook_path, sheet_name="PnL Summary")
+    df = df.iloc[3:].reset_index(drop=True)
+    df.columns = [
+        'account_name', 'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+        'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'total'
+    ]
+    return legacy_monthly_records(df, list(df.columns[1:13]), type_column=False)
+
+def legacy_reconciliation(workbook_path: str) -> list:
+    df = pd.read_excel(workbook_path, sheet_name="RECONCILIATION")
+    df = df.iloc[1:].reset_index(drop=True)
+    df.columns = [
+        'id', 'account_name', 'type', 'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+        'jul', 'aug', 'ytd'
+    ]
+    return legacy_monthly_records(df, list(df.columns[3:11]), type_column=True)
+
+def current_records(workbook_path: str, sheet_name: str, parse) -> list:
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        records = parse(workbook[sheet_name].iter_rows(values_only=True), YEAR)
+    finally:
+        workbook.close()
+    return [
+        (account_name, category, month, float(actuals))
+        for account_name, category, month, actuals in records[PNL_COLUMNS].itertuples(index=False, name=None)
+    ]
+
+def add_edge_values(workbook_path: str, seed: int, share: float):
+    """Overwrite a share of the month cells of both sheets with EDGE_VALUES."""
+    rng = random.Random(seed)
+    workbook = load_workbook(workbook_path)
+    # (sheet, first data row, month columns), 1-based as in openpyxl
+    for sheet_name, first_row, columns in (("PnL Summary", 5, range(2, 14)), ("RECONCILIATION", 3, range(4, 12))):
+        sheet = workbook[sheet_name]
+        for row in range(first_row, sheet.max_row + 1):
+            for column in columns:
+                if rng.random() < share:
+                    sheet.cell(row=row, column=column).value = rng.choice(EDGE_VALUES)
+    workbook.save(workbook_path)
+
+def compare(name: str, expected: list, actual: list) -> bool:
+    if expected == actual:
+        print(f"  {name}: {len(actual)} records, identical")
+        return True
+
+    first = next(
+        (index for index, (old, new) in enumerate(zip(expected, actual)) if old != new),
+        min(len(expected), len(actual))
+    )
+    print(f"  {name}: DIFFERENT ({len(expected)} previous records, {len(actual)} current), first difference at {first}:")
+    print(f"    previous: {expected[first] if first < len(expected) else None}")
+    print(f"    current:  {actual[first] if first < len(actual) else None}")
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--edge-share", type=float, default=0.05, help="Share of month cells overwritten with edge values")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in args.seeds:
+            months = 12 - seed % 6
+            path = generate_workbook(
+                os.path.join(directory, f"check_{seed}.xlsx"), accounts=args.accounts,
+                entities=1, red_flags=1, months=months, seed=seed
+            )
+            add_edge_values(path, seed, args.edge_share)
+            print(f"Seed {seed} ({args.accounts} accounts, {months} months):")
+
+            for sheet_name, legacy, parse in (
+                ("PnL Summary", legacy_pnl_summary, parse_pnl_summary_sheet),
+                ("RECONCILIATION", legacy_reconciliation, parse_reconciliation_sheet),
+            ):
+                start = time.perf_counter()
+                expected = legacy(path)
+                legacy_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                actual = current_records(path, sheet_name, parse)
+                current_seconds = time.perf_counter() - start
+
+                ok &= compare(sheet_name, expected, actual)
+                print(f"    previous {legacy_seconds:.3f}s, current {current_seconds:.3f}s (both including reading the sheet)")
+
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Check that re-ingesting a corrected workbook gives the KPIs of a fresh ingest.
+
+Generates a workbook and a corrected copy of it, where a share of the
+month cells of the P&L Summary and RECONCILIATION sheets get new values,
+are emptied or are filled in. The corrected workbook is then ingested
+twice, for two users and the same month: fresh for one, and as a
+correction re-ingested over the original for the other. Both must end up
+with the same P&L rows in sheet order and the same KPI rollup. Re-ingesting
+the corrected workbook once more must change no row.
+
+Runs against a throwaway SQLite database unless --database-url is given;
+the users and reports it creates are deleted afterwards.
+
+Usage (from the backend directory):
+    python -m scripts.check_reingest_kpis
+    python -m scripts.check_reingest_kpis --accounts 2000 --seeds 0 1 2 --share 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+from openpyxl import load_workbook
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import run_migrations
+from app.models import Base, User, Report, PnLData, PnLSeries, RedFlag, EntityAnalysis, KPIRollup
+from app.utils.data_processor import PNL_COLUMNS, PNL_POSITION_COLUMNS, process_excel_file, reingest_excel_file
+from app.utils.kpi_rollup import ROLLUP_METRICS, load_kpi_series, refresh_kpi_rollup
+from app.utils.series import pnl_row_order
+
+from .generate_workbook import generate_workbook
+
+MONTH = "2025-06"
+
+def correct_workbook(source: str, target: str, seed: int, share: float) -> str:
+    """Copy a workbook, changing, emptying or filling in a share of its P&L month cells."""
+    rng = random.Random(seed)
+    workbook = load_workbook(source)
+    # (sheet, first data row, month columns), 1-based as in openpyxl
+    for sheet_name, first_row, columns in (("PnL Summary", 5, range(2, 14)), ("RECONCILIATION", 3, range(4, 12))):
+        sheet = workbook[sheet_name]
+        for row in range(first_row, sheet.max_row + 1):
+            for column in columns:
+                if rng.random() < share:
+                    sheet.cell(row=row, column=column).value = rng.choice([round(rng.uniform(-10_000, 500_000), 2), None, 0])
+    workbook.save(target)
+    return target
+
+def create_report(db, file_path: str) -> Report:
+    user = User(username=f"check-{os.urandom(4).hex()}", email=f"{os.urandom(4).hex()}@check.local", hashed_password="")
+    db.add(user)
+    db.flush()
+    report = Report(
+        filename=os.path.basename(file_path), file_path=file_path, month=MONTH, year=int(MONTH[:4]),
+        owner_id=user.id, status="Processed", is_processed=True
+    )
+    db.add(report)
+    db.commit()
+    return report
+
+def publish(db, report: Report):
+    refresh_kpi_rollup(db, report.owner_id, report.month)
+    db.commit()
+
+def pnl_rows(db, report: Report) -> list:
+    return db.query(*(getattr(PnLData, column) for column in PNL_COLUMNS + PNL_POSITION_COLUMNS)).filter(
+        PnLData.report_id == report.id
+    ).order_by(*pnl_row_order(PnLData)).all()
+
+def kpis(db, report: Report) -> dict:
+    series = load_kpi_series(db, report.owner_id, report.month, 1, ROLLUP_METRICS)
+    return {metric: series.get(report.month, metric) for metric in ROLLUP_METRICS}
+
+def same_kpis(expected: dict, actual: dict) -> bool:
+    ok = True
+    for metric in ROLLUP_METRICS:
+        same = (expected[metric] is None and actual[metric] is None) or (
+            expected[metric] is not None and actual[metric] is not None and np.isclose(expected[metric], actual[metric])
+        )
+        print(f"    {metric:<14} fresh {expected[metric]!s:>22}  re-ingested {actual[metric]!s:>22}  {'' if same else 'DIFFERENT'}")
+        ok &= same
+    return ok
+
+def delete_reports(db, reports: list):
+    for report in reports:
+        for model in (PnLData, PnLSeries, RedFlag, EntityAnalysis, KPIRollup):
+            db.query(model).filter(model.report_id == report.id).delete(synchronize_session=False)
+        owner_id = report.owner_id
+        db.delete(report)
+        db.flush()
+        db.query(User).filter(User.id == owner_id).delete(synchronize_session=False)
+    db.commit()
+
+def check(db, directory: str, accounts: int, seed: int, share: float) -> bool:
+    original = generate_workbook(os.path.join(directory, f"original_{seed}.xlsx"), accounts=accounts, entities=5, red_flags=5, seed=seed)
+    corrected = correct_workbook(original, os.path.join(directory, f"corrected_{seed}.xlsx"), seed, share)
+    print(f"Seed {seed} ({accounts} accounts, {share:.0%} of the month cells corrected):")
+
+    fresh = create_report(db, corrected)
+    reingested = create_report(db, original)
+    try:
+        process_excel_file(corrected, fresh.id, db)
+        publish(db, fresh)
+
+        process_excel_file(original, reingested.id, db)
+        publish(db, reingested)
+        summary = reingest_excel_file(corrected, reingested.id, db)
+        publish(db, reingested)
+        print(f"  correction re-ingested: {summary}")
+
+        ok = True
+        expected_rows, actual_rows = pnl_rows(db, fresh), pnl_rows(db, reingested)
+        if expected_rows == actual_rows:
+            print(f"  P&L rows: {len(actual_rows)}, the same in sheet order")
+        else:
+            print(f"  P&L rows: DIFFERENT ({len(expected_rows)} fresh, {len(actual_rows)} re-ingested)")
+            ok = False
+
+        print("  KPIs:")
+        ok &= same_kpis(kpis(db, fresh), kpis(db, reingested))
+
+        summary = reingest_excel_file(corrected, reingested.id, db)
+        publish(db, reingested)
+        unchanged = summary["inserted"] == summary["updated"] == summary["deleted"] == 0
+        print(f"  same file re-ingested again: {summary}{'' if unchanged else ', expected no change'}")
+        return ok and unchanged
+    finally:
+        delete_reports(db, [fresh, reingested])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--share", type=float, default=0.1, help="Share of the P&L month cells corrected")
+    parser.add_argument("--database-url", help="Database to ingest into; defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(args.database_url or f"sqlite:///{os.path.join(directory, 'check.db')}")
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            for seed in args.seeds:
+                ok &= check(db, directory, args.accounts, seed, args.share)
+        finally:
+            db.close()
+            engine.dispose()
+
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Check that CSV/Parquet exports uploaded through /upload are ingested.
+
+Generates a workbook, exports its sheets to CSV, and saves the workbook, a
+single pnl_summary.csv and a zip of all the CSVs the way the upload
+endpoint does (save_upload_file, which prefixes the saved name to make it
+unique). Each saved file is then parsed as for ingestion: the rows of the
+zip are checked against those of the workbook, and those of the single
+CSV against a zip of just that file. Also checks that a manifest naming a
+file outside its zip is rejected.
+
+Runs in a throwaway directory; nothing is written to the database.
+
+Usage (from the backend directory):
+    python -m scripts.check_tabular_upload
+    python -m scripts.check_tabular_upload --accounts 2000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+
+import pandas as pd
+from openpyxl import load_workbook
+from starlette.datastructures import UploadFile
+
+from app.utils.bulk_writer import BulkWriter
+from app.utils.data_processor import SHEET_PROCESSORS, read_workbook
+from app.utils.file_handler import save_upload_file
+from app.utils.tabular_reader import tabular_sheets
+
+from .generate_workbook import generate_workbook
+
+def export_sheets(workbook_path: str, directory: str) -> list:
+    """Write each known sheet of the workbook to "<sheet name>.csv", as a rectangle; returns the paths."""
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    paths = []
+    for sheet_name in SHEET_PROCESSORS:
+        path = os.path.join(directory, sheet_name.lower().replace(' ', '_') + '.csv')
+        with open(path, 'w', newline='') as csv_file:
+            rows = list(workbook[sheet_name].iter_rows(values_only=True))
+            width = max(len(row) for row in rows)
+            writer = csv.writer(csv_file)
+            for row in rows:
+                writer.writerow(['' if value is None else value for value in row] + [''] * (width - len(row)))
+        paths.append(path)
+    workbook.close()
+    return paths
+
+def upload(path: str, user_id: int) -> str:
+    """Save a local file as an upload of the given user; returns the saved path."""
+    with open(path, 'rb') as source:
+        saved_path, _ = asyncio.run(save_upload_file(UploadFile(source, filename=os.path.basename(path)), user_id))
+    return saved_path
+
+def parse(path: str) -> dict:
+    """Columnar records parsed from a saved file, by table."""
+    writer = BulkWriter(None)
+    read_workbook(path, 1, 2025, writer)
+    return writer.batches
+
+def zip_files(zip_path: str, paths: list) -> str:
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+    return zip_path
+
+def same_rows(expected: dict, actual: dict, tables) -> bool:
+    ok = True
+    for table in tables:
+        try:
+            pd.testing.assert_frame_equal(pd.DataFrame(expected[table]), pd.DataFrame(actual.get(table, {})), check_dtype=False)
+            print(f"  {table}: {len(expected[table]['report_id'])} rows, as expected")
+        except AssertionError as error:
+            print(f"  {table}: differs: {error}")
+            ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--entities", type=int, default=40)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        # The upload directory is relative to the working directory
+        os.chdir(directory)
+        os.makedirs("export")
+        workbook_path = generate_workbook(os.path.join("export", "report.xlsx"), accounts=args.accounts, entities=args.entities)
+        csv_paths = export_sheets(workbook_path, "export")
+
+        print("Zip of CSV files upload:")
+        expected = parse(upload(workbook_path, 1))
+        ok &= same_rows(expected, parse(upload(zip_files(os.path.join("export", "report.zip"), csv_paths), 1)), expected.keys())
+
+        print("Single pnl_summary.csv upload:")
+        expected = parse(upload(zip_files(os.path.join("export", "pnl_summary.zip"), csv_paths[:1]), 1))
+        ok &= same_rows(expected, parse(upload(csv_paths[0], 1)), expected.keys())
+
+        print("Zip whose manifest names a file outside it:")
+        escape_path = os.path.join("export", "escape.zip")
+        with zipfile.ZipFile(escape_path, 'w') as archive:
+            archive.write(csv_paths[0], os.path.basename(csv_paths[0]))
+            archive.writestr("manifest.json", json.dumps({"sheets": {"PnL Summary": "../../export/pnl_summary.csv"}}))
+        try:
+            tabular_sheets(upload(escape_path, 1), list(SHEET_PROCESSORS))
+            print("  accepted")
+            ok = False
+        except ValueError as error:
+            print(f"  rejected: {error}")
+
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Generate synthetic month-end workbooks for ingestion benchmarks.
+
+The workbook has the four sheets process_excel_file understands, laid out the
+way the sheet processors expect them: "PnL Summary", "RECONCILIATION",
+"Red flags" and "Analysis Per Entity", plus a notes sheet that ingestion
+skips. Values include accounting strings such as "(1,234)" and "$5,000" so
+the coercion paths are exercised.
+
+Usage (from the backend directory):
+    python -m scripts.generate_workbook bench.xlsx --accounts 2000 --entities 500
+"""
+import argparse
+import random
+
+from openpyxl import Workbook
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# Fixed KPI accounts read by the dashboard, followed by generated ones
+KPI_ACCOUNTS = ["Group Revenue", "Gross Profit", "Net Profit before Tax"]
+ACCOUNT_PATTERNS = [
+    "Revenue - Product line {}", "Direct cost - Project {}", "Opex - Travel {}",
+    "Staff expense {}", "Other income {}"
+]
+COUNTRIES = ["France", "Germany", "Spain", "Italy", "Morocco", "Senegal", "Kenya", "UAE"]
+
+def account_names(count: int) -> list:
+    names = KPI_ACCOUNTS[:count]
+    for i in range(count - len(names)):
+        names.append(ACCOUNT_PATTERNS[i % len(ACCOUNT_PATTERNS)].format(i))
+    return names
+
+def format_amount(value: float, rng: random.Random):
+    """Return the amount as a number or, now and then, as an accounting string."""
+    roll = rng.random()
+    if roll < 0.05:
+        return f"({abs(value):,.0f})" if value < 0 else f"${value:,.0f}"
+    if roll < 0.10:
+        return None
+    return round(value, 2)
+
+def write_pnl_summary(workbook: Workbook, names: list, months: int, rng: random.Random):
+    sheet = workbook.create_sheet("PnL Summary")
+    sheet.append(["P&L Summary"])
+    sheet.append([])
+    sheet.append(["Actuals"])
+    sheet.append(["Account Name"] + MONTH_NAMES + ["Total"])
+
+    for name in names:
+        base = rng.uniform(-50_000, 500_000)
+        values = [format_amount(base * rng.uniform(0.8, 1.2), rng) for _ in range(months)]
+        values += [None] * (12 - months)
+        total = sum(value for value in values if isinstance(value, float))
+        sheet.append([name] + values + [round(total, 2)])
+
+def write_reconciliation(workbook: Workbook, names: list, months: int, rng: random.Random):
+    sheet = workbook.create_sheet("RECONCILIATION")
+    sheet.append(["Reconciliation"])
+    sheet.append(["ID", "Account Name", "Type"] + MONTH_NAMES[:8] + ["YTD"])
+
+    months = min(months, 8)
+    for i, name in enumerate(names):
+        for row_type in ("Actual HL", "Budget"):
+            values = [format_amount(rng.uniform(-10_000, 100_000), rng) for _ in range(months)]
+            values += [None] * (8 - months)
+            total = sum(value for value in values if isinstance(value, float))
+            sheet.append([i + 1, name, row_type] + values + [round(total, 2)])
+
+def write_red_flags(workbook: Workbook, count: int, rng: random.Random):
+    sheet = workbook.create_sheet("Red flags")
+    sheet.append(["Red flags"])
+    sheet.append(["No", "Account Name", "Total Revenue", "Total Cost", "Gross Profit", "GPM", "Comment"])
+
+    for i in range(count):
+        revenue = rng.uniform(10_000, 1_000_000)
+        cost = revenue * rng.uniform(0.85, 1.1)
+        gross_profit = revenue - cost
+        gpm = f"{gross_profit / revenue * 100:.1f}%"
+        sheet.append([
+            i + 1, f"Project{i}_{rng.choice(COUNTRIES)}", round(revenue, 2), round(cost, 2),
+            round(gross_profit, 2), gpm, "Margin below target"
+        ])
+
+def write_entity_analysis(workbook: Workbook, count: int, rng: random.Random):
+    sheet = workbook.create_sheet("Analysis Per Entity")
+    sheet.append(["Entity", "Local", "Interco", "Total"])
+
+    for i in range(count):
+        local_revenue, interco_revenue = rng.uniform(100_000, 5_000_000), rng.uniform(0, 500_000)
+        local_cost, interco_cost = local_revenue * rng.uniform(0.5, 0.9), interco_revenue * rng.uniform(0.5, 0.9)
+        sheet.append([f"Entity {i} - {rng.choice(COUNTRIES)}", None, None, None])
+        sheet.append(["Revenue", round(local_revenue, 2), round(interco_revenue, 2), round(local_revenue + interco_revenue, 2)])
+        sheet.append(["Cost of Sales", round(local_cost, 2), round(interco_cost, 2), round(local_cost + interco_cost, 2)])
+        sheet.append(["Gross Profit", None, None, round(local_revenue + interco_revenue - local_cost - interco_cost, 2)])
+
+def generate_workbook(
+    path: str,
+    accounts: int = 500,
+    entities: int = 50,
+    red_flags: int = 100,
+    months: int = 12,
+    seed: int = 0
+) -> str:
+    """
+    Write a synthetic workbook.
+
+    Args:
+        path: Where to save the xlsx file
+        accounts: Number of P&L accounts (also used for RECONCILIATION)
+        entities: Number of entity blocks in Analysis Per Entity
+        red_flags: Number of red-flag projects
+        months: Number of months with values (1-12)
+        seed: Random seed, so the same parameters give the same file
+
+    Returns:
+        The path of the saved workbook
+    """
+    rng = random.Random(seed)
+    months = max(1, min(months, 12))
+    names = account_names(accounts)
+
+    # write_only streams rows to disk, which keeps memory flat for large files
+    workbook = Workbook(write_only=True)
+    write_pnl_summary(workbook, names, months, rng)
+    write_reconciliation(workbook, names, months, rng)
+    write_red_flags(workbook, red_flags, rng)
+    write_entity_analysis(workbook, entities, rng)
+    workbook.create_sheet("Notes").append(["Generated workbook, not parsed by ingestion"])
+
+    workbook.save(path)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--entities", type=int, default=50)
+    parser.add_argument("--red-flags", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_workbook(args.path, args.accounts, args.entities, args.red_flags, args.months, args.seed)
+    print(f"Workbook written to {args.path}")
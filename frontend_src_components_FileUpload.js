@@ -99,7 +99,7 @@ const FileUpload = ({ onUploadSuccess }) => {
       dataIndex: 'status',
       key: 'status',
       render: status => (
-        <Tag color={status === 'Processed' ? 'green' : 'orange'}>
+        <Tag color={status === 'Processed' ? 'green' : status === 'Archived' ? 'blue' : 'orange'}>
           {status}
         </Tag>
       ),
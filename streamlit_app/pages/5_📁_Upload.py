@@ -1,6 +1,9 @@
 import streamlit as st
 import requests
 import io
+import re
+import json
+import time
 
 # Importer la fonction utilitaire
 import sys
@@ -12,11 +15,89 @@ st.set_page_config(page_title="Téléversement de Fichier", page_icon="📁")
 
 st.title("📁 Téléverser un Nouveau Rapport")
 
+mode = st.sidebar.radio("Mode de téléversement", ["Un rapport", "Plusieurs mois (lot)"])
+
+if mode == "Plusieurs mois (lot)":
+    st.sidebar.header("Fichiers du Lot")
+    batch_files = st.sidebar.file_uploader(
+        "Choisissez les fichiers mensuels",
+        type=['xlsx', 'zip'],
+        accept_multiple_files=True,
+        help="Un fichier .xlsx par mois, ou un .zip les regroupant. "
+             "Le mois est lu dans le nom du fichier (ex: PnL_2025-03.xlsx) et peut être corrigé ci-dessous."
+    )
+    
+    if not batch_files:
+        st.info("Sélectionnez les fichiers à téléverser dans la barre latérale.")
+        st.stop()
+    
+    # Mois de chaque fichier, pré-rempli à partir de son nom
+    months = {}
+    for batch_file in batch_files:
+        if batch_file.name.lower().endswith(".zip"):
+            st.caption(f"📦 {batch_file.name} : le mois de chaque fichier de l'archive est lu dans son nom")
+            continue
+        match = re.search(r"(?<!\d)(20\d{2})[-_. ]?(0[1-9]|1[0-2])(?!\d)", batch_file.name)
+        months[batch_file.name] = st.text_input(
+            f"Mois de {batch_file.name}",
+            value=f"{match.group(1)}-{match.group(2)}" if match else "",
+            key=f"month_{batch_file.name}"
+        )
+    
+    if not st.button("Lancer le traitement du lot"):
+        st.stop()
+    
+    backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
+    with st.spinner("Téléversement du lot en cours..."):
+        try:
+            response = requests.post(
+                f"{backend_url}/api/data/upload/batch",
+                files=[
+                    ("files", (batch_file.name, batch_file.getvalue(), batch_file.type or "application/octet-stream"))
+                    for batch_file in batch_files
+                ],
+                data={"months": json.dumps({name: month for name, month in months.items() if month})}
+            )
+            response.raise_for_status()
+            batch = response.json()
+        except requests.exceptions.RequestException as e:
+            detail = e.response.text if e.response is not None else e
+            st.error(f"❌ Erreur lors du téléversement du lot : {detail}")
+            st.stop()
+    
+    # Suivre chaque fichier jusqu'à la fin du lot
+    overall = st.progress(0.0, text="Traitement du lot...")
+    table = st.empty()
+    while batch:
+        done = batch["processed"] + batch["failed"]
+        overall.progress(done / batch["total"], text=f"{done} / {batch['total']} fichiers traités")
+        table.table([
+            {
+                "Fichier": file["name"],
+                "Mois": file["month"],
+                "Statut": "Déjà téléversé" if file["duplicate"] else file["status"],
+                "Progression": f"{file['progress']['done']}/{file['progress']['total']} feuilles" if file.get("progress") else "",
+                "Erreur": file.get("error") or ""
+            }
+            for file in batch["files"]
+        ])
+        if batch["status"] == "Completed":
+            break
+        time.sleep(1)
+        batch = call_backend(f"data/batches/{batch['batchId']}")
+    
+    if batch and batch["failed"]:
+        st.warning(f"⚠️ {batch['failed']} fichier(s) n'ont pas pu être traités ; les autres sont disponibles.")
+    elif batch:
+        st.success("✅ Tous les fichiers du lot ont été traités avec succès !")
+    st.stop()
+
 st.sidebar.header("Détails du Rapport")
 uploaded_file = st.sidebar.file_uploader(
     "Choisissez un fichier Excel",
-    type=['xlsx'],
-    help="Téléversez votre fichier de rapport de management (format .xlsx)"
+    type=['xlsx', 'csv', 'parquet', 'zip'],
+    help="Téléversez votre fichier de rapport de management (format .xlsx), "
+         "ou un export CSV/Parquet de ses feuilles (un fichier par feuille, regroupés dans un .zip)"
 )
 
 month = st.sidebar.text_input("Mois du rapport (ex: 2025-10)", value="2025-10")
@@ -24,14 +105,14 @@ year = st.sidebar.number_input("Année du rapport", value=2025, min_value=2020,
 
 if uploaded_file and month and year:
     # Préparer le fichier pour l'envoi
-    files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type or "application/octet-stream")}
     # Préparer les données du formulaire
     payload = {"month": month, "year": year}
     
     # Envoyer la requête multipart/form-data
     backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
     
-    with st.spinner("Téléversement et traitement en cours..."):
+    with st.spinner("Téléversement en cours..."):
         try:
             response = requests.post(
                 f"{backend_url}/api/data/upload",
@@ -41,12 +122,31 @@ if uploaded_file and month and year:
             response.raise_for_status()
             
             result = response.json()
-            if result.get("success"):
-                st.success(f"✅ Le fichier '{uploaded_file.name}' a été téléversé et traité avec succès !")
-                st.info("Les données sont maintenant disponibles dans le Tableau de Bord.")
-            else:
-                st.error(f"❌ Erreur lors du traitement : {result.get('message', 'Erreur inconnue')}")
+            if not result.get("success"):
+                st.error(f"❌ Erreur lors du téléversement : {result.get('message', 'Erreur inconnue')}")
+                st.stop()
         except requests.exceptions.RequestException as e:
             st.error(f"❌ Erreur de communication avec le backend : {e}")
+            st.stop()
+    
+    # Suivre le traitement en arrière-plan jusqu'à sa fin
+    progress_bar = st.progress(0.0, text="Traitement en attente...")
+    job = result
+    while job and job.get("status") in ("Queued", "Processing"):
+        progress = job.get("progress") or {}
+        if progress.get("total"):
+            progress_bar.progress(
+                progress["done"] / progress["total"],
+                text=f"Traitement de la feuille '{progress['sheet']}'..."
+            )
+        time.sleep(1)
+        job = call_backend(f"data/jobs/{result['jobId']}")
+    
+    if job and job.get("status") == "Processed":
+        progress_bar.progress(1.0, text="Traitement terminé")
+        st.success(f"✅ Le fichier '{uploaded_file.name}' a été téléversé et traité avec succès !")
+        st.info("Les données sont maintenant disponibles dans le Tableau de Bord.")
+    elif job:
+        st.error(f"❌ Erreur lors du traitement : {job.get('error') or 'Erreur inconnue'}")
 else:
     st.info("Veuillez remplir toutes les informations dans la barre latérale pour téléverser un fichier.")
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import os
 import pandas as pd
 from datetime import datetime
 
@@ -13,15 +14,28 @@ st.set_page_config(
 
 # Fonction pour appeler le backend
 def call_backend(endpoint, method="GET", json_payload=None):
-    """Utilitaire pour appeler notre API FastAPI."""
+    """
+    Utilitaire pour appeler notre API FastAPI.
+
+    Les réponses GET portant un ETag sont gardées dans la session : l'appel
+    suivant envoie If-None-Match et, sur un 304, réutilise la réponse gardée
+    sans la retélécharger.
+    """
     backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
     try:
         if method == "GET":
-            response = requests.get(f"{backend_url}/api/{endpoint}")
+            cached = st.session_state.setdefault("backend_etags", {}).get(endpoint)
+            headers = {"If-None-Match": cached["etag"]} if cached else {}
+            response = requests.get(f"{backend_url}/api/{endpoint}", headers=headers)
+            if response.status_code == 304 and cached:
+                return cached["data"]
         elif method == "POST":
             response = requests.post(f"{backend_url}/api/{endpoint}", json=json_payload)
         response.raise_for_status()  # Lève une exception pour les réponses 4xx/5xx
-        return response.json()
+        data = response.json()
+        if method == "GET" and response.headers.get("ETag"):
+            st.session_state["backend_etags"][endpoint] = {"etag": response.headers["ETag"], "data": data}
+        return data
     except requests.exceptions.RequestException as e:
         st.error(f"Erreur de connexion au backend : {e}")
         return None